@@ -0,0 +1,179 @@
+import argparse
+
+import numpy as np
+
+
+# Sign/threshold Bakry-Emery curvature without eigenvalues. The vendored GCS
+# functions build every vertex's local matrix A_n from a q x q x q `sum4`
+# tensor and take eigvalsh(A_n)[0]. Here the same matrices are assembled from
+# each vertex's neighbour rows only, stacked per degree, and "curvature >= k"
+# is answered by an LDL^T positive-definiteness test of A_n - k*I.
+
+# GCS rounds curvature to 3 decimals, so a reported value v satisfies v >= k
+# exactly when the raw value exceeds k - ROUNDING_EPS.
+ROUNDING_EPS = 5e-4
+# Caps the (vertices, degree, q) neighbour-row stacks at ~32 MB per chunk.
+CHUNK_ELEMENTS = 1 << 22
+
+
+def threshold_label(k):
+    return f"{k:g}".replace("-", "m").replace(".", "p")
+
+
+def parse_thresholds(value):
+    # "m0.5,0,0.5" -> [-0.5, 0.0, 0.5]. The "m" prefix mirrors threshold_label:
+    # argparse takes a bare "-0.5,0.5" for an option, so negatives need either
+    # this spelling or the --bakry-thresholds=-0.5,0.5 form.
+    thresholds = []
+    for token in value.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        if token[0] in "mM":
+            token = "-" + token[1:]
+        try:
+            thresholds.append(float(token))
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid threshold {token!r}") from None
+    return thresholds
+
+
+def sign_fields(prefix, thresholds):
+    fields = [f"{prefix}_count", f"{prefix}_pos_frac", f"{prefix}_zero_frac", f"{prefix}_neg_frac"]
+    return fields + [f"{prefix}_ge_{threshold_label(k)}_frac" for k in thresholds]
+
+
+def threshold_fields(prefix, thresholds):
+    return [f"{prefix}_ge_{threshold_label(k)}_frac" for k in thresholds]
+
+
+def threshold_fractions(values, prefix, thresholds):
+    # Full-mode counterpart of sign_features, computed from GCS's rounded values.
+    n = len(values)
+    return {
+        f"{prefix}_ge_{threshold_label(k)}_frac": round(sum(1 for v in values if v >= k) / n, 6) if n else ""
+        for k in thresholds
+    }
+
+
+def positive_definite(M):
+    # Batched LDL^T without pivoting: a symmetric matrix is positive definite
+    # iff every pivot is positive. Matrices that already failed stop being
+    # updated so the rest of the batch can continue.
+    L = np.array(M, dtype=float)
+    ok = np.ones(L.shape[0], dtype=bool)
+    for j in range(L.shape[1]):
+        pivot = L[:, j, j]
+        ok &= pivot > 0
+        bad = ~ok
+        pivot = np.where(bad, 1.0, pivot)
+        col = np.where(bad[:, None], 0.0, L[:, j + 1:, j])
+        L[:, j + 1:, j + 1:] -= col[:, :, None] * col[:, None, :] / pivot[:, None, None]
+    return ok
+
+
+def _two_sphere(W2, A):
+    twosp = (W2 != 0) & (A == 0)
+    np.fill_diagonal(twosp, False)
+    return twosp.astype(float)
+
+
+def _degree_groups(A, degrees):
+    order = np.argsort(degrees, kind="stable")
+    sorted_degrees = degrees[order]
+    q = len(degrees)
+    for m in np.unique(sorted_degrees):
+        if m == 0:
+            continue
+        xs = order[sorted_degrees == m]
+        nbrs = np.array([np.flatnonzero(A[x]) for x in xs])
+        step = max(1, CHUNK_ELEMENTS // (int(m) * q))
+        for start in range(0, len(xs), step):
+            yield xs[start:start + step], nbrs[start:start + step]
+
+
+def local_matrices(A, dimension, normalised):
+    """
+    Yield (vertices, matrices, scale) per chunk of equal-degree vertices, where
+    matrices[i] is the vendored A_n of vertices[i] and its curvature is
+    eigvalsh(matrices[i])[0] / scale.
+    """
+    A = np.asarray(A, dtype=float)
+    degrees = A.sum(axis=1).astype(int)
+    regular = len(set(degrees.tolist())) == 1
+    dim_term = 0.0 if dimension == float("inf") else -2 / dimension
+
+    if not normalised or regular:
+        # The regular normalised case is the non-normalised matrix scaled by 1/r.
+        A_2 = A @ A
+        twosp = _two_sphere(A_2, A)
+        recip = np.divide(1.0, A_2, out=np.zeros_like(A_2), where=twosp > 0)
+        for xs, nbrs in _degree_groups(A, degrees):
+            m = nbrs.shape[1]
+            rows = A[nbrs]
+            S = (rows * recip[xs][:, None, :]) @ rows.transpose(0, 2, 1)
+            M = 1 - 2 * A[nbrs[:, :, None], nbrs[:, None, :]] - 2 * S
+            diag = (
+                5 / 2
+                - m / 2
+                + 2 * A_2[xs[:, None], nbrs]
+                + 3 / 2 * np.einsum("kaz,kz->ka", rows, twosp[xs])
+                - 2 * np.einsum("kaz,kz->ka", rows, recip[xs])
+            )
+            idx = np.arange(m)
+            M[:, idx, idx] = diag
+            scale = m if normalised else 1
+            yield xs, M + dim_term, scale
+        return
+
+    P = A / np.maximum(degrees, 1)[:, None]
+    P_2 = P @ P
+    twosp = _two_sphere(P_2, A)
+    recip = np.divide(1.0, P_2, out=np.zeros_like(P_2), where=twosp > 0)
+    for xs, nbrs in _degree_groups(A, degrees):
+        m = nbrs.shape[1]
+        px = 1.0 / m
+        rows = P[nbrs]
+        S = 2 * (rows * recip[xs][:, None, :]) @ rows.transpose(0, 2, 1)
+        P_nn = P[nbrs[:, :, None], nbrs[:, None, :]]
+        M = px - P_nn - P_nn.transpose(0, 2, 1) - px * S
+        diag = (
+            px
+            - 1 / 2
+            + 3 / 2 * P[nbrs, xs[:, None]]
+            + 3 / 2 * np.einsum("kaz,kz->ka", rows, twosp[xs])
+            + 3 / 2 * np.einsum("kaz,kz->ka", rows, A[xs])
+            + 1 / 2 * P_2[xs[:, None], nbrs] / px
+            - px * 2 * np.einsum("kaz,kz->ka", rows ** 2, recip[xs])
+        )
+        idx = np.arange(m)
+        M[:, idx, idx] = diag
+        yield xs, M + dim_term * px, 1
+
+
+def threshold_counts(A, dimension, normalised, thresholds):
+    # Vertices whose reported (rounded) curvature is >= each threshold.
+    A = np.asarray(A, dtype=float)
+    isolated = int((A.sum(axis=1) == 0).sum())
+    counts = {k: isolated if k <= 0 else 0 for k in thresholds}
+    for _, M, scale in local_matrices(A, dimension, normalised):
+        eye = np.eye(M.shape[1])
+        for k in thresholds:
+            counts[k] += int(positive_definite(M - scale * (k - ROUNDING_EPS) * eye).sum())
+    return len(A), counts
+
+
+def sign_features(A, prefix, dimension, normalised, thresholds):
+    tested = sorted({0.0, 0.001, *thresholds})
+    n, counts = threshold_counts(A, dimension, normalised, tested)
+    if not n:
+        return {field: (0 if field.endswith("_count") else "") for field in sign_fields(prefix, thresholds)}
+    features = {
+        f"{prefix}_count": n,
+        f"{prefix}_pos_frac": round(counts[0.001] / n, 6),
+        f"{prefix}_zero_frac": round((counts[0.0] - counts[0.001]) / n, 6),
+        f"{prefix}_neg_frac": round((n - counts[0.0]) / n, 6),
+    }
+    for k in thresholds:
+        features[f"{prefix}_ge_{threshold_label(k)}_frac"] = round(counts[k] / n, 6)
+    return features
@@ -0,0 +1,253 @@
+import argparse
+import contextlib
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+
+from profiling import summarize_profiles
+from scheduler import (
+    Task,
+    blas_threads,
+    memory_model,
+    row_estimates,
+    scheduled_map,
+    throughput_report,
+    write_memory_log,
+)
+from sharding import execution_option, execution_parameters
+from streaming import PipelineStats, WriteStage, staged_tasks
+
+
+# A batch file lists (split, split set, parameters, output) jobs that run in one
+# process: each network in any job's split is read once and dispatched as a
+# single task carrying the settings of every job that includes it, and the
+# extractor computes each (network, measure, parameters) result once.
+#
+#   defaults: {max-edges: 1000}
+#   jobs:
+#     - {split: data/splits/a.csv, split_set: train, output: data/features/a_train.csv}
+#     - {split: data/splits/a.csv, split_set: test, output: data/features/a_test.csv,
+#        params: {idleness: 0.25}}
+#
+# Options that describe the whole run (the dataset index and every execution
+# option but the output: scheduling, the GCS server backend, ...) come from the
+# command line only.
+RUN_OPTIONS = {"dataset_index"}
+JOB_KEYS = {"split", "split_set", "output", "params"}
+
+
+def add_batch_argument(parser):
+    execution_option(
+        parser,
+        "--batch",
+        default="",
+        help="YAML file of (split, split_set, params, output) jobs computed in one pass over the networks",
+    )
+
+
+def load_batch(path):
+    try:
+        import yaml
+    except ImportError:
+        print("PyYAML is required. Install with: pip install pyyaml", file=sys.stderr)
+        sys.exit(1)
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def batch_jobs_or_exit(args, parser):
+    try:
+        return job_namespaces(load_batch(args.batch), args, parser)
+    except (OSError, ValueError, argparse.ArgumentTypeError) as exc:
+        parser.error(f"{args.batch}: {exc}")
+
+
+def _normalise(values):
+    return {str(key).replace("-", "_"): value for key, value in (values or {}).items()}
+
+
+def job_namespaces(config, base_args, parser):
+    """
+    One argparse namespace per job: the CLI arguments, overridden by the
+    file's `defaults`, then by the job's `params`, split, split_set and output.
+    """
+    actions = {action.dest: action for action in parser._actions}
+    run_options = RUN_OPTIONS | (execution_parameters(base_args) - {"output"})
+    defaults = _normalise(config.get("defaults"))
+    jobs = []
+    outputs = set()
+    for i, job in enumerate(config.get("jobs") or []):
+        unknown_keys = set(job) - JOB_KEYS
+        if unknown_keys:
+            raise ValueError(f"job {i}: unknown keys {sorted(unknown_keys)} (expected {sorted(JOB_KEYS)})")
+        if not job.get("output"):
+            raise ValueError(f"job {i}: output is required")
+        values = dict(defaults)
+        values.update(_normalise(job.get("params")))
+        values.update({key: job[key] for key in ("split", "split_set", "output") if key in job})
+        unknown = sorted(set(values) - set(actions))
+        if unknown:
+            raise ValueError(f"job {i}: unknown options {unknown}")
+        fixed = sorted(set(values) & run_options)
+        if fixed:
+            raise ValueError(f"job {i}: {fixed} apply to the whole batch and must be given on the command line")
+        if values["output"] in outputs:
+            raise ValueError(f"job {i}: output {values['output']} is written by another job")
+        outputs.add(values["output"])
+
+        namespace = argparse.Namespace(**vars(base_args))
+        for key, value in values.items():
+            convert = actions[key].type
+            if isinstance(value, str) and callable(convert):
+                value = convert(value)
+            setattr(namespace, key, "" if value is None else value)
+        jobs.append(namespace)
+    if not jobs:
+        raise ValueError("batch file lists no jobs")
+    return jobs
+
+
+def read_split_filter(split, split_set):
+    split_filter = {}
+    if split:
+        with open(split, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if split_set and row.get("split") != split_set:
+                    continue
+                split_filter[row.get("name", "")] = row
+    return split_filter
+
+
+def job_members(index_rows, jobs):
+    # For each index row (in index order), the jobs whose split selects it.
+    filters = [read_split_filter(job.split, job.split_set) for job in jobs]
+    members = []
+    for row in index_rows:
+        name = row.get("name", "")
+        selected = [j for j, split_filter in enumerate(filters) if not split_filter or name in split_filter]
+        if selected:
+            members.append((row, selected))
+    return members
+
+
+def missing_path(row):
+    if row.get("path_status") in {"missing", "ambiguous", "normalized_ambiguous"}:
+        return True
+    path = row.get("file_path", "")
+    return not path or not os.path.exists(path)
+
+
+def plan_pass(entries, jobs, position, processed):
+    """
+    The next pass of (row, selected jobs) over entries, in index order. A job
+    with a limit takes only as many networks as it still needs, starting after
+    the last one it was given, so nothing past its limit is computed; position
+    is advanced in place.
+    """
+    needed = [job.limit - done if job.limit else len(entries) for job, done in zip(jobs, processed)]
+    planned = []
+    for i, (row, selected) in enumerate(entries):
+        take = [j for j in selected if i >= position[j] and needed[j] > 0]
+        for j in take:
+            needed[j] -= 1
+            position[j] = i + 1
+        if take:
+            planned.append((row, take))
+    for j, remaining in enumerate(needed):
+        if remaining > 0:
+            position[j] = len(entries)
+    return planned
+
+
+def run_batch(args, jobs, configs, process_batch, load):
+    """
+    Run every job in one scheduled pass. configs[j] is the extractor's
+    (settings, output_fields, measures) for jobs[j]; process_batch takes
+    (row, [settings, ...]) and returns one (status, features) per settings,
+    and load is the extractor's loader for --prefetch. When networks are
+    skipped while computing, jobs left short of their --limit get another
+    pass over the networks after the ones they were given.
+    """
+    with open(args.dataset_index, newline="", encoding="utf-8") as f:
+        index_rows = list(csv.DictReader(f))
+
+    processed = [0] * len(jobs)
+    skipped = [defaultdict(int) for _ in jobs]
+    model = memory_model(args)
+    entries = []
+    for row, selected in job_members(index_rows, jobs):
+        if missing_path(row):
+            for j in selected:
+                skipped[j]["missing_path"] += 1
+            continue
+        entries.append((row, selected))
+
+    def build_tasks(planned):
+        tasks = []
+        for row, selected in planned:
+            measures = list(dict.fromkeys(m for j in selected for m in configs[j][2]))
+            limits = [jobs[j].max_edges for j in selected]
+            max_edges = max(limits) if all(limits) else 0
+            estimates = row_estimates(row, measures, max_edges)
+            threads = blas_threads(args.blas_strategy, args.cores, args.blas_min_nodes, row, measures)
+            payload = (row, [configs[j][0] for j in selected])
+            tasks.append(Task(len(tasks), payload, row.get("name", ""), estimates, model, threads))
+        return tasks
+
+    observations = []
+    stats = PipelineStats(args.prefetch)
+    profile_started = time.time()
+    started = time.perf_counter()
+    networks = 0
+    position = [0] * len(jobs)
+    with contextlib.ExitStack() as stack:
+        writers = []
+        for job, (_, output_fields, _) in zip(jobs, configs):
+            os.makedirs(os.path.dirname(job.output), exist_ok=True)
+            f = stack.enter_context(open(job.output, "w", newline="", encoding="utf-8"))
+            writer = csv.DictWriter(f, fieldnames=output_fields)
+            writer.writeheader()
+            writers.append(writer)
+
+        cores = args.cores if args.blas_strategy else 0
+        output = stack.enter_context(WriteStage(args.prefetch, stats))
+        while True:
+            planned = plan_pass(entries, jobs, position, processed)
+            if not planned:
+                break
+            tasks = build_tasks(planned)
+            networks += len(tasks)
+            source = staged_tasks(tasks, load, args, stats)
+            results = scheduled_map(process_batch, source, args.workers, args.memory_limit, model, observations, cores)
+            with contextlib.closing(results):
+                for task, outcomes in results:
+                    for j, (status, features) in zip(planned[task.index][1], outcomes):
+                        if status != "ok":
+                            skipped[j][status] += 1
+                            continue
+                        output.put(writers[j].writerow, features)
+                        processed[j] += 1
+
+    model.save()
+    wall = time.perf_counter() - started
+    if args.blas_strategy or args.workers > 1:
+        for line in throughput_report(observations, wall, args.blas_strategy):
+            print(line)
+    if args.prefetch:
+        stats.observe_compute(observations)
+        for line in stats.report(wall):
+            print(line)
+    if args.memory_log:
+        write_memory_log(args.memory_log, observations)
+    if args.profile:
+        for line in summarize_profiles(args.profile, profile_started):
+            print(line)
+
+    print("networks", networks)
+    for job, done, counts in zip(jobs, processed, skipped):
+        print("output", job.output)
+        print("  processed", done)
+        for key, val in counts.items():
+            print(f"  skipped_{key}", val)
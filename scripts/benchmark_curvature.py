@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import gc
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from compute_curvature_features_gcs import (
+    build_adjacency,
+    compute_edge_curvatures,
+    compute_link_resistance,
+    compute_vertex_curvatures,
+    load_gcs_modules,
+)
+from compute_curvature_features import compute_orc
+from ollivier_sinkhorn import ollivier_sinkhorn
+
+
+GCS_EDGE_MEASURES = ["orc", "orc_idl", "lly", "nnlly"]
+GCS_VERTEX_MEASURES = ["be_non_norm", "be_norm", "be_non_norm_dim", "be_norm_dim", "steiner", "node_res"]
+GCS_APPROX_MEASURES = ["orc_sk", "orc_idl_sk"]
+GRC_MEASURES = ["grc_orc", "grc_frc"]
+DEFAULT_MEASURES = ["orc", "orc_idl", "lly", "nnlly", "be_non_norm", "be_norm", "steiner", "node_res", "link_res"] + GRC_MEASURES
+
+
+def parse_list(value, cast):
+    return [cast(v) for v in value.split(",") if v]
+
+
+def generate_bipartite(node_count, connectance, heterogeneity, seed, row_fraction=0.4):
+    # Chung-Lu style bipartite web: lognormal node weights (sigma=heterogeneity)
+    # set the degree spread, and edge probabilities are scaled so the expected
+    # connectance matches. Every node keeps at least one link, as in the dataset.
+    rng = random.Random(seed)
+    n_rows = max(2, int(round(node_count * row_fraction)))
+    n_cols = max(2, node_count - n_rows)
+    row_w = [rng.lognormvariate(0.0, heterogeneity) for _ in range(n_rows)]
+    col_w = [rng.lognormvariate(0.0, heterogeneity) for _ in range(n_cols)]
+    mean_rw = sum(row_w) / n_rows
+    mean_cw = sum(col_w) / n_cols
+
+    edges = set()
+    for i, wr in enumerate(row_w):
+        for j, wc in enumerate(col_w):
+            p = min(1.0, connectance * (wr / mean_rw) * (wc / mean_cw))
+            if rng.random() < p:
+                edges.add((i, j))
+    row_deg = [0] * n_rows
+    col_deg = [0] * n_cols
+    for i, j in edges:
+        row_deg[i] += 1
+        col_deg[j] += 1
+    for i in range(n_rows):
+        if row_deg[i] == 0:
+            j = rng.randrange(n_cols)
+            edges.add((i, j))
+            col_deg[j] += 1
+    for j in range(n_cols):
+        if col_deg[j] == 0:
+            edges.add((rng.randrange(n_rows), j))
+    nodes = {f"r{i}" for i in range(n_rows)} | {f"c{j}" for j in range(n_cols)}
+    return nodes, [(f"r{i}", f"c{j}") for i, j in sorted(edges)]
+
+
+def child_rss_peak(fn):
+    # GraphRicciCurvature computes in a fork Pool even with proc=1, so
+    # tracemalloc here never sees its allocations. Run fn in a fresh forked
+    # process instead and report how far that process, or any of its pool
+    # workers (each forked at the same RSS), grew above its starting RSS.
+    import multiprocessing
+    import resource
+
+    context = multiprocessing.get_context("fork")
+    reader, writer = context.Pipe(duplex=False)
+    unit = 1 if sys.platform == "darwin" else 1024
+
+    def target():
+        start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        fn()
+        peak = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+        writer.send(max(0, peak - start) * unit)
+
+    process = context.Process(target=target)
+    process.start()
+    writer.close()
+    try:
+        return reader.recv()
+    except EOFError:
+        return None
+    finally:
+        process.join()
+
+
+def measure_run(fn, repeat, track_memory, in_children=False):
+    times = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    peak = None
+    if track_memory and in_children:
+        gc.collect()
+        peak = child_rss_peak(fn)
+    elif track_memory:
+        # Separate pass: tracemalloc slows allocation-heavy code, so it must not
+        # pollute the timings. numpy buffers are traced too.
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return min(times), peak, result
+
+
+def gcs_runner(measure, A, edge_pairs, gcs_curv, gcs_graph, idleness, bakry_dim):
+    flags = {measure: True}
+    if measure in GCS_EDGE_MEASURES:
+        return lambda: compute_edge_curvatures(edge_pairs, A, gcs_graph, idleness, flags)[measure]
+    if measure in GCS_APPROX_MEASURES:
+        p = idleness if measure == "orc_idl_sk" else 0.0
+        return lambda: ollivier_sinkhorn(A, edge_pairs, p)[0]
+    if measure == "link_res":
+        return lambda: compute_link_resistance(edge_pairs, A, gcs_curv)
+    return lambda: list(compute_vertex_curvatures(A, gcs_curv, flags, bakry_dim)[measure])
+
+
+def grc_graph(node_count, edge_pairs):
+    import networkx as nx
+
+    g = nx.Graph()
+    g.add_nodes_from(range(node_count))
+    g.add_edges_from(edge_pairs)
+    return g
+
+
+def grc_orc(g, alpha, proc):
+    # The extractor's own call with GraphRicciCurvature's default transport
+    # method. proc=None is the extractor's --workers 1 case: one pool process
+    # per core.
+    return compute_orc(g.copy(), alpha, proc)
+
+
+def grc_orc_exact(g, alpha):
+    from GraphRicciCurvature.OllivierRicci import OllivierRicci
+
+    # Exact transport, only as the parity reference for GCS ocurve/lazocurve.
+    orc = OllivierRicci(g.copy(), alpha=alpha, method="OTD", proc=1, verbose="ERROR")
+    orc.compute_ricci_curvature()
+    return {(min(u, v), max(u, v)): d["ricciCurvature"] for u, v, d in orc.G.edges(data=True)}
+
+
+def grc_frc(g):
+    from GraphRicciCurvature.FormanRicci import FormanRicci
+
+    frc = FormanRicci(g.copy())
+    frc.compute_ricci_curvature()
+    return {(min(u, v), max(u, v)): d["formanCurvature"] for u, v, d in frc.G.edges(data=True)}
+
+
+def parity(gcs_values, grc_values, edge_pairs):
+    diffs = [abs(a - grc_values[e]) for a, e in zip(gcs_values, edge_pairs)]
+    return max(diffs) if diffs else 0.0
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare_baseline(results, baseline_path, time_tolerance, memory_tolerance, min_seconds):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["graph"], r["measure"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get((r["graph"], r["measure"]))
+        if old is None:
+            continue
+        if r["time_s"] > old["time_s"] * (1 + time_tolerance) and r["time_s"] - old["time_s"] > min_seconds:
+            regressions.append(f"{r['graph']} {r['measure']}: time {old['time_s']:.4f}s -> {r['time_s']:.4f}s")
+        if r.get("peak_bytes") and old.get("peak_bytes") and r["peak_bytes"] > old["peak_bytes"] * (1 + memory_tolerance):
+            regressions.append(
+                f"{r['graph']} {r['measure']}: peak {old['peak_bytes']} -> {r['peak_bytes']} bytes"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark curvature measures on synthetic bipartite webs.")
+    parser.add_argument("--nodes", default="20,50,100", help="Comma-separated node counts")
+    parser.add_argument("--connectance", default="0.1,0.3", help="Comma-separated target connectances")
+    parser.add_argument(
+        "--heterogeneity",
+        default="0,1",
+        help="Comma-separated lognormal sigmas for degree heterogeneity (0=homogeneous)",
+    )
+    parser.add_argument("--seeds", default="7", help="Comma-separated generator seeds")
+    parser.add_argument(
+        "--measures",
+        default=",".join(DEFAULT_MEASURES),
+        help="Comma-separated measures (GCS prefixes, link_res, orc_sk, orc_idl_sk, grc_orc, grc_frc)",
+    )
+    parser.add_argument("--idleness", type=float, default=0.5, help="Ollivier idleness / GRC alpha")
+    parser.add_argument("--bakry-dimension", type=float, default=3.0, help="Dimension for *_dim measures")
+    parser.add_argument(
+        "--grc-proc",
+        type=int,
+        default=1,
+        help=(
+            "GraphRicciCurvature pool processes for grc_orc "
+            "(0=one per core, as the extractor uses with --workers 1)"
+        ),
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions (minimum is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory pass")
+    parser.add_argument("--no-parity", action="store_true", help="Skip GCS vs GraphRicciCurvature parity")
+    parser.add_argument("--parity-tolerance", type=float, default=1e-6, help="Max allowed |GCS - GRC|")
+    parser.add_argument(
+        "--output",
+        default="",
+        help="Results JSON (default: outputs/benchmarks/curvature_<timestamp>.json)",
+    )
+    parser.add_argument("--baseline", default="", help="Previous results JSON to flag regressions against")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="Allowed relative peak growth")
+    parser.add_argument("--min-seconds", type=float, default=0.01, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    measures = parse_list(args.measures, str)
+    unknown = set(measures) - set(
+        GCS_EDGE_MEASURES + GCS_VERTEX_MEASURES + GCS_APPROX_MEASURES + GRC_MEASURES + ["link_res"]
+    )
+    if unknown:
+        parser.error(f"unknown measures: {sorted(unknown)}")
+    need_grc = any(m in GRC_MEASURES for m in measures) or not args.no_parity
+
+    gcs_curv, gcs_graph = load_gcs_modules()
+    results = []
+    parity_rows = []
+    failures = []
+
+    for n in parse_list(args.nodes, int):
+        for c in parse_list(args.connectance, float):
+            for h in parse_list(args.heterogeneity, float):
+                for seed in parse_list(args.seeds, int):
+                    graph_id = f"n{n}_c{c:g}_h{h:g}_s{seed}"
+                    nodes, edges = generate_bipartite(n, c, h, seed)
+                    A, node_list, edge_pairs = build_adjacency(nodes, edges)
+                    g = grc_graph(len(node_list), edge_pairs) if need_grc else None
+                    base = {
+                        "graph": graph_id,
+                        "nodes": n,
+                        "connectance": c,
+                        "heterogeneity": h,
+                        "seed": seed,
+                        "node_count": len(node_list),
+                        "edge_count": len(edge_pairs),
+                    }
+                    values = {}
+                    for measure in measures:
+                        if measure == "grc_orc":
+                            fn = lambda: grc_orc(g, args.idleness, args.grc_proc or None)
+                        elif measure == "grc_frc":
+                            fn = lambda: grc_frc(g)
+                        else:
+                            fn = gcs_runner(
+                                measure, A, edge_pairs, gcs_curv, gcs_graph, args.idleness, args.bakry_dimension
+                            )
+                        try:
+                            seconds, peak, values[measure] = measure_run(
+                                fn, args.repeat, not args.no_memory, in_children=measure == "grc_orc"
+                            )
+                        except Exception as exc:
+                            failures.append(f"{graph_id} {measure}: {exc}")
+                            continue
+                        row = dict(base, backend="grc" if measure in GRC_MEASURES else "gcs", measure=measure)
+                        row["time_s"] = round(seconds, 6)
+                        row["peak_bytes"] = peak
+                        row["peak_source"] = "child_rss" if measure == "grc_orc" else "tracemalloc"
+                        results.append(row)
+                        print(f"{graph_id} {measure}: {seconds:.4f}s" + (f" peak={peak}" if peak else ""))
+
+                    if not args.no_parity:
+                        # GCS ocurve is ORC with zero idleness; lazocurve(p) is
+                        # GRC's OllivierRicci with alpha=p.
+                        checks = [("orc", 0.0), ("orc_idl", args.idleness)]
+                        for measure, alpha in checks:
+                            gcs_values = values.get(measure)
+                            if gcs_values is None:
+                                continue
+                            grc_values = grc_orc_exact(g, alpha)
+                            diff = parity(gcs_values, grc_values, edge_pairs)
+                            ok = diff <= args.parity_tolerance
+                            parity_rows.append(
+                                {"graph": graph_id, "gcs": measure, "grc_alpha": alpha, "max_abs_diff": diff, "ok": ok}
+                            )
+                            if not ok:
+                                failures.append(f"{graph_id} parity {measure} vs alpha={alpha}: {diff:.3g}")
+
+    report = {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+        "parity": parity_rows,
+        "failures": failures,
+    }
+    output = args.output or os.path.join(
+        "outputs", "benchmarks", f"curvature_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=lambda v: None if isinstance(v, float) and math.isnan(v) else str(v))
+        f.write("\n")
+    print("results written to", output)
+
+    regressions = []
+    if args.baseline:
+        regressions = compare_baseline(
+            results, args.baseline, args.time_tolerance, args.memory_tolerance, args.min_seconds
+        )
+        for regression in regressions:
+            print("regression:", regression, file=sys.stderr)
+        print("regressions", len(regressions))
+    for failure in failures:
+        print("failure:", failure, file=sys.stderr)
+    if failures or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
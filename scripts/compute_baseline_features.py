@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import math
+import os
+import sys
+from collections import defaultdict
+
+from batch_jobs import missing_path, read_split_filter
+from sharding import (
+    assign_shards,
+    build_manifest,
+    execution_option,
+    parse_shard,
+    record_limit_skips,
+    select_candidates,
+    shard_output_path,
+    write_manifest,
+)
+
+
+# Python port of the spectral/structural subset of the authors' R baseline
+# (see export_baseline_features.R). Column names match the R results files so
+# the tables can be compared or joined directly.
+BASELINE_FIELDS = [
+    "l1",
+    "l2",
+    "l3",
+    "ipr1",
+    "ipr2",
+    "ipr3",
+    "l1_lap",
+    "l2_lap",
+    "l3_lap",
+    "alg_conn",
+    "clustering_c",
+    "clustering_r",
+    "deg_assort",
+]
+
+# Below this many nodes a dense eigendecomposition is faster than ARPACK.
+DENSE_MAX_NODES = 200
+TOP_K = 3
+
+
+def load_edgelist(path):
+    edges = []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) < 2:
+                continue
+            edges.append((row[0], row[1]))
+    return edges
+
+
+def load_scientific():
+    try:
+        import numpy as np
+        import scipy.sparse as sp
+        import scipy.sparse.linalg as spla
+    except ImportError:
+        print("numpy and scipy are required. Install with: pip install numpy scipy", file=sys.stderr)
+        sys.exit(1)
+    return np, sp, spla
+
+
+def build_sparse_graph(edges):
+    np, sp, _ = load_scientific()
+    # Rows are the first edgelist column, columns the second. Labels share one
+    # namespace, as in the curvature extractors.
+    row_labels = sorted({u for u, _ in edges})
+    col_labels = sorted({v for _, v in edges})
+    node_list = sorted(set(row_labels) | set(col_labels))
+    idx = {node: i for i, node in enumerate(node_list)}
+    n = len(node_list)
+
+    pairs = set()
+    for u, v in edges:
+        i, j = idx[u], idx[v]
+        if i != j:
+            pairs.add((min(i, j), max(i, j)))
+    pairs = sorted(pairs)
+    ii = np.array([i for i, _ in pairs] + [j for _, j in pairs], dtype=np.int64)
+    jj = np.array([j for _, j in pairs] + [i for i, _ in pairs], dtype=np.int64)
+    A = sp.csr_matrix((np.ones(len(ii)), (ii, jj)), shape=(n, n))
+
+    row_idx = np.array([idx[u] for u in row_labels], dtype=np.int64)
+    col_idx = np.array([idx[v] for v in col_labels], dtype=np.int64)
+    return A, row_idx, col_idx, pairs
+
+
+def top_eigenpairs(M, k, vectors):
+    np, _, spla = load_scientific()
+    n = M.shape[0]
+    k = min(k, n)
+    if n <= DENSE_MAX_NODES or k >= n - 1:
+        dense = M.toarray()
+        if vectors:
+            vals, vecs = np.linalg.eigh(dense)
+            return vals[::-1][:k], vecs[:, ::-1][:, :k]
+        return np.linalg.eigvalsh(dense)[::-1][:k], None
+    if vectors:
+        vals, vecs = spla.eigsh(M, k=k, which="LA")
+        order = np.argsort(vals)[::-1]
+        return vals[order], vecs[:, order]
+    vals = spla.eigsh(M, k=k, which="LA", return_eigenvectors=False)
+    return np.sort(vals)[::-1], None
+
+
+def algebraic_connectivity(L):
+    np, _, spla = load_scientific()
+    n = L.shape[0]
+    if n < 2:
+        return float("nan")
+    if n <= DENSE_MAX_NODES:
+        return float(np.linalg.eigvalsh(L.toarray())[1])
+    # Shift-invert around a point just below zero: the two smallest eigenvalues
+    # become the largest of (L - sigma I)^-1, which ARPACK finds quickly.
+    vals = spla.eigsh(L.tocsc(), k=2, sigma=-1e-3, which="LM", return_eigenvectors=False)
+    return float(np.sort(vals)[1])
+
+
+def projection_transitivity(A, nodes):
+    np, sp, _ = load_scientific()
+    if len(nodes) < 3:
+        return float("nan")
+    # One-mode projection onto `nodes`, unweighted, without self loops.
+    B = A[nodes]
+    P = (B @ B.T).tocsr()
+    P.setdiag(0)
+    P.eliminate_zeros()
+    P.data[:] = 1.0
+    degrees = np.asarray(P.sum(axis=1)).ravel()
+    triples = float((degrees * (degrees - 1)).sum())
+    if triples == 0:
+        return float("nan")
+    closed = float((P @ P).multiply(P).sum())
+    return closed / triples
+
+
+def degree_assortativity(A, pairs):
+    np, _, _ = load_scientific()
+    if not pairs:
+        return float("nan")
+    degrees = np.asarray(A.sum(axis=1)).ravel()
+    src = np.array([i for i, _ in pairs] + [j for _, j in pairs])
+    dst = np.array([j for _, j in pairs] + [i for i, _ in pairs])
+    x = degrees[src]
+    y = degrees[dst]
+    if x.std() == 0 or y.std() == 0:
+        return float("nan")
+    return float(np.corrcoef(x, y)[0, 1])
+
+
+def baseline_features(edges):
+    np, sp, _ = load_scientific()
+    A, row_idx, col_idx, pairs = build_sparse_graph(edges)
+    n = A.shape[0]
+
+    vals, vecs = top_eigenpairs(A, TOP_K, vectors=True)
+    iprs = (vecs ** 4).sum(axis=0) / (vecs ** 2).sum(axis=0) ** 2
+
+    degrees = np.asarray(A.sum(axis=1)).ravel()
+    L = (sp.diags(degrees) - A).tocsr()
+    lap_vals, _ = top_eigenpairs(L, TOP_K, vectors=False)
+
+    features = {
+        "alg_conn": algebraic_connectivity(L),
+        "clustering_c": projection_transitivity(A, col_idx),
+        "clustering_r": projection_transitivity(A, row_idx),
+        "deg_assort": degree_assortativity(A, pairs),
+    }
+    for k in range(TOP_K):
+        features[f"l{k + 1}"] = float(vals[k]) if k < len(vals) else float("nan")
+        features[f"ipr{k + 1}"] = float(iprs[k]) if k < len(iprs) else float("nan")
+        features[f"l{k + 1}_lap"] = float(lap_vals[k]) if k < len(lap_vals) else float("nan")
+
+    out = {}
+    for key in BASELINE_FIELDS:
+        value = features[key]
+        out[key] = "" if math.isnan(value) else round(value, 6)
+    return out, n, len(pairs)
+
+
+def compare_with_r(rows, r_path, randomization, output=""):
+    """
+    Relative differences |py - R| / max(1, |R|) per baseline column over the
+    networks both tables cover. Prints a summary, optionally writes it to
+    `output`, and returns {column: {"n", "max_rel_diff", "median_rel_diff",
+    "worst"}} (columns without overlap are left out).
+    """
+    with open(r_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        r_rows = {}
+        for row in reader:
+            if randomization and row.get("randomization", randomization) != randomization:
+                continue
+            r_rows[row.get("name", "")] = row
+
+    diffs = defaultdict(list)
+    compared = 0
+    for row in rows:
+        r_row = r_rows.get(row["name"])
+        if r_row is None:
+            continue
+        compared += 1
+        for key in BASELINE_FIELDS:
+            try:
+                ours = float(row[key])
+                theirs = float(r_row.get(key, ""))
+            except ValueError:
+                continue
+            if math.isnan(theirs):
+                continue
+            diffs[key].append((abs(ours - theirs) / max(1.0, abs(theirs)), row["name"]))
+
+    print("compared", compared, "networks against", r_path)
+    summary = {}
+    for key in BASELINE_FIELDS:
+        vals = sorted(diffs[key])
+        if not vals:
+            print(f"{key}: no overlap")
+            continue
+        summary[key] = {
+            "n": len(vals),
+            "max_rel_diff": vals[-1][0],
+            "median_rel_diff": vals[len(vals) // 2][0],
+            "worst": vals[-1][1],
+        }
+        print(
+            f"{key}: n={len(vals)} max_rel_diff={vals[-1][0]:.3g} "
+            f"median_rel_diff={vals[len(vals) // 2][0]:.3g} worst={vals[-1][1]}"
+        )
+
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["feature", "n", "max_rel_diff", "median_rel_diff", "worst"])
+            writer.writeheader()
+            for key, stats in summary.items():
+                writer.writerow(dict(stats, feature=key))
+        print("parity summary written to", output)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute spectral/structural baseline features in Python.")
+    parser.add_argument(
+        "--dataset-index",
+        default="data/dataset_index.csv",
+        help="Dataset index CSV with file paths",
+    )
+    parser.add_argument(
+        "--split",
+        default="",
+        help="Optional split CSV to filter networks",
+    )
+    parser.add_argument(
+        "--split-set",
+        default="",
+        help="Optional split set to filter (train/test)",
+    )
+    execution_option(
+        parser,
+        "--output",
+        default="data/features/baseline_features_py.csv",
+        help="Output CSV path",
+    )
+    parser.add_argument(
+        "--max-edges",
+        type=int,
+        default=0,
+        help="Skip networks with more than this many edges (0=disable)",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=0,
+        help="Limit number of networks processed (0=disable)",
+    )
+    execution_option(
+        parser,
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Process only shard i of N (0-based, e.g. 0/4); writes a per-shard output and manifest",
+    )
+    execution_option(
+        parser,
+        "--compare-r",
+        default="",
+        help="Baseline CSV from export_baseline_features.R to validate against",
+    )
+    execution_option(
+        parser,
+        "--randomization",
+        default="empirical",
+        help="Randomization level to compare against in --compare-r",
+    )
+    execution_option(
+        parser,
+        "--compare-output",
+        default="",
+        help="Optional CSV of the per-column --compare-r deviations",
+    )
+    args = parser.parse_args()
+
+    split_filter = read_split_filter(args.split, args.split_set)
+
+    with open(args.dataset_index, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        index_rows = list(reader)
+
+    output_path = args.output
+    assigned = set()
+    if args.shard:
+        candidates = select_candidates(index_rows, split_filter)
+        assignment = assign_shards(candidates, args.shard[1])
+        index_rows = [row for row in candidates if assignment[row.get("name", "")] == args.shard[0]]
+        assigned = {row.get("name", "") for row in index_rows}
+        output_path = shard_output_path(args.output, args.shard)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    output_fields = [
+        "name",
+        "type",
+        "interaction_type",
+        "interaction_subtype",
+        "node_count",
+        "edge_count",
+    ] + BASELINE_FIELDS
+
+    processed = 0
+    skipped = defaultdict(int)
+    processed_names = []
+    skipped_names = {}
+    written = []
+
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=output_fields)
+        writer.writeheader()
+
+        for row in index_rows:
+            name = row.get("name", "")
+            if split_filter and name not in split_filter:
+                continue
+            if missing_path(row):
+                skipped["missing_path"] += 1
+                skipped_names[name] = "missing_path"
+                continue
+
+            edges = load_edgelist(row["file_path"])
+            if args.max_edges and len(edges) > args.max_edges:
+                skipped["too_large"] += 1
+                skipped_names[name] = "too_large"
+                continue
+            if not edges:
+                skipped["empty"] += 1
+                skipped_names[name] = "empty"
+                continue
+
+            try:
+                values, node_count, edge_count = baseline_features(edges)
+            except Exception as exc:
+                skipped["baseline_error"] += 1
+                skipped_names[name] = "baseline_error"
+                print(f"error computing baseline features for {name}: {exc}", file=sys.stderr)
+                continue
+
+            features = {
+                "name": name,
+                "type": row.get("type", ""),
+                "interaction_type": row.get("interaction_type", ""),
+                "interaction_subtype": row.get("interaction_subtype", ""),
+                "node_count": node_count,
+                "edge_count": edge_count,
+            }
+            features.update(values)
+            writer.writerow(features)
+            written.append(features)
+            processed += 1
+            processed_names.append(name)
+
+            if args.limit and processed >= args.limit:
+                break
+
+    if args.shard:
+        if args.limit and processed >= args.limit:
+            skipped["limit"] += record_limit_skips(assigned, processed_names, skipped_names)
+        manifest = build_manifest(args, args.shard, output_path, assigned, processed_names, skipped_names)
+        print("manifest written to", write_manifest(output_path, manifest))
+
+    print("processed", processed)
+    for key, val in skipped.items():
+        print(f"skipped_{key}", val)
+
+    if args.compare_r:
+        compare_with_r(written, args.compare_r, args.randomization, args.compare_output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,37 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
 import csv
 import os
 import sys
+import time
 from collections import defaultdict
 
+from batch_jobs import add_batch_argument, batch_jobs_or_exit, missing_path, read_split_filter, run_batch
+from profiling import add_profile_arguments, measure_label, profile_settings, profiled_call, profiling, summarize_profiles
+from scheduler import (
+    Task,
+    add_scheduler_arguments,
+    blas_threads,
+    check_blas_control,
+    memory_model,
+    row_estimates,
+    scheduled_map,
+    throughput_report,
+    write_memory_log,
+)
+from sharding import (
+    assign_shards,
+    build_manifest,
+    execution_option,
+    parse_shard,
+    record_limit_skips,
+    select_candidates,
+    shard_output_path,
+    write_manifest,
+)
+from streaming import PipelineStats, WriteStage, add_prefetch_argument, staged_tasks
+
 
 def percentile(sorted_vals, q):
     if not sorted_vals:
@@ -78,10 +105,68 @@ def load_edgelist(path, use_weights):
     return g
 
 
-def compute_curvatures(g, alpha):
+def integer_graph(g):
+    try:
+        import networkx as nx
+    except ImportError:
+        print("networkx is required. Install with: pip install networkx", file=sys.stderr)
+        sys.exit(1)
+
+    # GraphRicciCurvature relies on networkit, which requires contiguous integer nodes.
+    return nx.convert_node_labels_to_integers(g, first_label=0, ordering="default")
+
+
+def orc_processes(workers):
+    # Parallel workers already fill the cores; nested pools would oversubscribe.
+    return 1 if workers > 1 else None
+
+
+class _InProcessPool:
+    # Stands in for the multiprocessing Pool GraphRicciCurvature creates.
+    def __init__(self, processes=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def imap_unordered(self, fn, iterable, chunksize=None):
+        return [fn(item) for item in iterable]
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class _InProcessContext:
+    Pool = _InProcessPool
+
+    def get_context(self, method=None):
+        return self
+
+
+@contextlib.contextmanager
+def grc_in_process():
+    # OllivierRicci always computes its edges in a forked Pool, even with
+    # proc=1, where a profiler in this process sees only pool.join. Under
+    # --profile the edges are computed here instead.
+    import GraphRicciCurvature.OllivierRicci as grc_ollivier
+
+    original = grc_ollivier.mp
+    grc_ollivier.mp = _InProcessContext()
+    try:
+        yield
+    finally:
+        grc_ollivier.mp = original
+
+
+def compute_orc(g_int, alpha, proc=None, in_process=False):
     try:
         from GraphRicciCurvature.OllivierRicci import OllivierRicci
-        from GraphRicciCurvature.FormanRicci import FormanRicci
     except ImportError:
         print(
             "GraphRicciCurvature is required. Install with: pip install GraphRicciCurvature",
@@ -89,34 +174,161 @@ def compute_curvatures(g, alpha):
         )
         sys.exit(1)
 
-    try:
-        import networkx as nx
-    except ImportError:
-        print("networkx is required. Install with: pip install networkx", file=sys.stderr)
-        sys.exit(1)
-
-    # GraphRicciCurvature relies on networkit, which requires contiguous integer nodes.
-    g_int = nx.convert_node_labels_to_integers(g, first_label=0, ordering="default")
-
-    orc = OllivierRicci(g_int, alpha=alpha, verbose="ERROR")
-    orc.compute_ricci_curvature()
-    orc_graph = orc.G
-    orc_values = [
+    # proc=None keeps GraphRicciCurvature's default of one process per core.
+    options = {"proc": proc} if proc else {}
+    orc = OllivierRicci(g_int, alpha=alpha, verbose="ERROR", **options)
+    with grc_in_process() if in_process else contextlib.nullcontext():
+        orc.compute_ricci_curvature()
+    return [
         data.get("ricciCurvature")
-        for _, _, data in orc_graph.edges(data=True)
+        for _, _, data in orc.G.edges(data=True)
         if data.get("ricciCurvature") is not None
     ]
 
+
+def compute_frc(g_int):
+    try:
+        from GraphRicciCurvature.FormanRicci import FormanRicci
+    except ImportError:
+        print(
+            "GraphRicciCurvature is required. Install with: pip install GraphRicciCurvature",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
     frc = FormanRicci(g_int)
     frc.compute_ricci_curvature()
-    frc_graph = frc.G
-    frc_values = [
+    return [
         data.get("formanCurvature")
-        for _, _, data in frc_graph.edges(data=True)
+        for _, _, data in frc.G.edges(data=True)
         if data.get("formanCurvature") is not None
     ]
 
-    return orc_values, frc_values
+
+def compute_curvatures(g, alpha, proc=None):
+    g_int = integer_graph(g)
+    return compute_orc(g_int, alpha, proc), compute_frc(g_int)
+
+
+def load_network(job):
+    """
+    Read the network of a (row, settings) or (row, [settings, ...]) job once
+    per weighting. Returns {use_weights: (graph, integer-labelled graph)}; the
+    integer graph is None when no settings admit the network.
+    """
+    row, settings = job[:2]
+    settings_list = settings if isinstance(settings, list) else [settings]
+    graphs = {}
+    for use_weights in dict.fromkeys(s["use_weights"] for s in settings_list):
+        g = load_edgelist(row.get("file_path", ""), use_weights)
+        admitted = any(
+            not s["max_edges"] or g.number_of_edges() <= s["max_edges"]
+            for s in settings_list
+            if s["use_weights"] == use_weights
+        )
+        graphs[use_weights] = (g, integer_graph(g) if admitted else None)
+    return graphs
+
+
+def process_network_batch(job):
+    """
+    Compute features of one network for several settings (batch jobs).
+    The edgelist is read once per weighting and each (measure, parameters)
+    result is computed once; both curvature classes work on copies of the graph.
+    Returns one (status, features) pair per settings entry.
+    """
+    row, settings_list = job[:2]
+    name = row.get("name", "")
+    # A prefetching loader appends the parsed graphs to the job.
+    graphs = job[2] if len(job) > 2 else load_network(job)
+    cache = {}
+    outcomes = []
+    for settings in settings_list:
+        use_weights = settings["use_weights"]
+        g, g_int = graphs[use_weights]
+        edge_count = g.number_of_edges()
+        if settings["max_edges"] and edge_count > settings["max_edges"]:
+            outcomes.append(("too_large", None))
+            continue
+
+        orc_key = ("orc", settings["alpha"], use_weights)
+        frc_key = ("frc", use_weights)
+        profile = settings["profile"]
+        try:
+            if orc_key not in cache:
+                cache[orc_key] = profiled_call(
+                    profile,
+                    name,
+                    measure_label(orc_key),
+                    compute_orc,
+                    g_int,
+                    settings["alpha"],
+                    settings["proc"],
+                    profiling(profile, name),
+                )
+            if frc_key not in cache:
+                cache[frc_key] = profiled_call(profile, name, measure_label(frc_key), compute_frc, g_int)
+        except Exception as exc:
+            print(f"error computing curvature for {name}: {exc}", file=sys.stderr)
+            outcomes.append(("curvature_error", None))
+            continue
+
+        features = {
+            "name": name,
+            "type": row.get("type", ""),
+            "interaction_type": row.get("interaction_type", ""),
+            "interaction_subtype": row.get("interaction_subtype", ""),
+            "node_count": g.number_of_nodes(),
+            "edge_count": edge_count,
+        }
+        features.update(summarize(cache[orc_key], "orc"))
+        features.update(summarize(cache[frc_key], "frc"))
+        outcomes.append(("ok", features))
+    return outcomes
+
+
+def process_network(job):
+    row, settings = job[:2]
+    return process_network_batch((row, [settings]) + tuple(job[2:]))[0]
+
+
+def job_config(args):
+    """Return (settings, output_fields, measures) for one set of options."""
+    output_fields = [
+        "name",
+        "type",
+        "interaction_type",
+        "interaction_subtype",
+        "node_count",
+        "edge_count",
+        "orc_count",
+        "orc_mean",
+        "orc_std",
+        "orc_min",
+        "orc_max",
+        "orc_q05",
+        "orc_q50",
+        "orc_q95",
+        "orc_neg_frac",
+        "frc_count",
+        "frc_mean",
+        "frc_std",
+        "frc_min",
+        "frc_max",
+        "frc_q05",
+        "frc_q50",
+        "frc_q95",
+        "frc_neg_frac",
+    ]
+
+    settings = {
+        "use_weights": args.use_weights,
+        "max_edges": args.max_edges,
+        "alpha": args.alpha,
+        "proc": orc_processes(args.workers),
+        "profile": profile_settings(args),
+    }
+    return settings, output_fields, ["grc_orc", "grc_frc"]
 
 
 def main():
@@ -136,7 +348,8 @@ def main():
         default="",
         help="Optional split set to filter (train/test)",
     )
-    parser.add_argument(
+    execution_option(
+        parser,
         "--output",
         default="data/features/curvature_features.csv",
         help="Output CSV path",
@@ -159,96 +372,118 @@ def main():
         default=0,
         help="Limit number of networks processed (0=disable)",
     )
+    execution_option(
+        parser,
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Process only shard i of N (0-based, e.g. 0/4); writes a per-shard output and manifest",
+    )
+    add_scheduler_arguments(parser)
+    add_batch_argument(parser)
+    add_prefetch_argument(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    check_blas_control(args)
+    if args.profile_names and not args.profile:
+        parser.error("--profile-names requires --profile")
 
-    split_filter = {}
-    if args.split:
-        with open(args.split, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if args.split_set and row.get("split") != args.split_set:
-                    continue
-                split_filter[row.get("name", "")] = row
+    if args.batch:
+        if args.shard:
+            parser.error("--batch cannot be combined with --shard")
+        jobs = batch_jobs_or_exit(args, parser)
+        run_batch(args, jobs, [job_config(job) for job in jobs], process_network_batch, load_network)
+        return
+
+    split_filter = read_split_filter(args.split, args.split_set)
 
     with open(args.dataset_index, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         index_rows = list(reader)
 
+    output_path = args.output
+    assigned = set()
+    if args.shard:
+        candidates = select_candidates(index_rows, split_filter)
+        assignment = assign_shards(candidates, args.shard[1])
+        index_rows = [row for row in candidates if assignment[row.get("name", "")] == args.shard[0]]
+        assigned = {row.get("name", "") for row in index_rows}
+        output_path = shard_output_path(args.output, args.shard)
+
     os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    output_fields = [
-        "name",
-        "type",
-        "interaction_type",
-        "interaction_subtype",
-        "node_count",
-        "edge_count",
-        "orc_count",
-        "orc_mean",
-        "orc_std",
-        "orc_min",
-        "orc_max",
-        "orc_q05",
-        "orc_q50",
-        "orc_q95",
-        "orc_neg_frac",
-        "frc_count",
-        "frc_mean",
-        "frc_std",
-        "frc_min",
-        "frc_max",
-        "frc_q05",
-        "frc_q50",
-        "frc_q95",
-        "frc_neg_frac",
-    ]
+    settings, output_fields, measures = job_config(args)
 
     processed = 0
     skipped = defaultdict(int)
+    processed_names = []
+    skipped_names = {}
 
-    with open(args.output, "w", newline="", encoding="utf-8") as f:
+    model = memory_model(args)
+    tasks = []
+    for row in index_rows:
+        name = row.get("name", "")
+        if split_filter and name not in split_filter:
+            continue
+        if missing_path(row):
+            skipped["missing_path"] += 1
+            skipped_names[name] = "missing_path"
+            continue
+        estimates = row_estimates(row, measures, args.max_edges)
+        threads = blas_threads(args.blas_strategy, args.cores, args.blas_min_nodes, row, measures)
+        tasks.append(Task(len(tasks), (row, settings), name, estimates, model, threads))
+
+    observations = []
+    stats = PipelineStats(args.prefetch)
+    profile_started = time.time()
+    started = time.perf_counter()
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=output_fields)
         writer.writeheader()
 
-        for row in index_rows:
-            name = row.get("name", "")
-            if split_filter and name not in split_filter:
-                continue
-            if row.get("path_status") in {"missing", "ambiguous", "normalized_ambiguous"}:
-                skipped["missing_path"] += 1
-                continue
-            path = row.get("file_path", "")
-            if not path or not os.path.exists(path):
-                skipped["missing_path"] += 1
-                continue
+        cores = args.cores if args.blas_strategy else 0
+        results = scheduled_map(
+            process_network,
+            staged_tasks(tasks, load_network, args, stats),
+            args.workers,
+            args.memory_limit,
+            model,
+            observations,
+            cores,
+        )
+        with contextlib.closing(results), WriteStage(args.prefetch, stats) as output:
+            for task, (status, features) in results:
+                if status != "ok":
+                    skipped[status] += 1
+                    skipped_names[task.label] = status
+                    continue
 
-            g = load_edgelist(path, args.use_weights)
-            edge_count = g.number_of_edges()
-            if args.max_edges and edge_count > args.max_edges:
-                skipped["too_large"] += 1
-                continue
+                output.put(writer.writerow, features)
+                processed += 1
+                processed_names.append(task.label)
 
-            try:
-                orc_values, frc_values = compute_curvatures(g, args.alpha)
-            except Exception as exc:
-                skipped["curvature_error"] += 1
-                print(f"error computing curvature for {name}: {exc}", file=sys.stderr)
-                continue
+                if args.limit and processed >= args.limit:
+                    break
+
+    model.save()
+    wall = time.perf_counter() - started
+    if args.blas_strategy or args.workers > 1:
+        for line in throughput_report(observations, wall, args.blas_strategy):
+            print(line)
+    if args.prefetch:
+        stats.observe_compute(observations)
+        for line in stats.report(wall):
+            print(line)
+    if args.memory_log:
+        write_memory_log(args.memory_log, observations)
+    if args.profile:
+        for line in summarize_profiles(args.profile, profile_started):
+            print(line)
 
-            features = {
-                "name": name,
-                "type": row.get("type", ""),
-                "interaction_type": row.get("interaction_type", ""),
-                "interaction_subtype": row.get("interaction_subtype", ""),
-                "node_count": g.number_of_nodes(),
-                "edge_count": edge_count,
-            }
-            features.update(summarize(orc_values, "orc"))
-            features.update(summarize(frc_values, "frc"))
-            writer.writerow(features)
-            processed += 1
-
-            if args.limit and processed >= args.limit:
-                break
+    if args.shard:
+        if args.limit and processed >= args.limit:
+            skipped["limit"] += record_limit_skips(assigned, processed_names, skipped_names)
+        manifest = build_manifest(args, args.shard, output_path, assigned, processed_names, skipped_names)
+        print("manifest written to", write_manifest(output_path, manifest))
 
     print("processed", processed)
     for key, val in skipped.items():
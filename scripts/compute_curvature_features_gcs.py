@@ -1,11 +1,43 @@
 #!/usr/bin/env python3
 import argparse
+import contextlib
 import csv
+import json
 import os
 import sys
+import time
+import urllib.request
 from collections import defaultdict
 from pathlib import Path
 
+from bakry_emery import parse_thresholds, sign_features, sign_fields, threshold_fields, threshold_fractions
+from batch_jobs import add_batch_argument, batch_jobs_or_exit, missing_path, read_split_filter, run_batch
+from compute_baseline_features import BASELINE_FIELDS, baseline_features
+from ollivier_sinkhorn import MIN_REG, ollivier_sinkhorn
+from profiling import add_profile_arguments, measure_label, profile_settings, profiled_call, summarize_profiles
+from scheduler import (
+    Task,
+    add_scheduler_arguments,
+    blas_threads,
+    check_blas_control,
+    memory_model,
+    row_estimates,
+    scheduled_map,
+    throughput_report,
+    write_memory_log,
+)
+from sharding import (
+    assign_shards,
+    build_manifest,
+    execution_option,
+    parse_shard,
+    record_limit_skips,
+    select_candidates,
+    shard_output_path,
+    write_manifest,
+)
+from streaming import PipelineStats, WriteStage, add_prefetch_argument, staged_tasks
+
 
 def percentile(sorted_vals, q):
     if not sorted_vals:
@@ -138,11 +170,312 @@ def compute_vertex_curvatures(A, gcs_curv, compute_flags, bakry_dim):
     return results
 
 
+def error_fields(prefix):
+    return [f"{prefix}_err_mean", f"{prefix}_err_max"]
+
+
+def summarize_errors(bounds, prefix):
+    if not bounds:
+        return {field: "" for field in error_fields(prefix)}
+    return {
+        f"{prefix}_err_mean": round(sum(bounds) / len(bounds), 6),
+        f"{prefix}_err_max": round(max(bounds), 6),
+    }
+
+
 def compute_link_resistance(edge_pairs, A, gcs_curv):
     lrc = gcs_curv.linkResistanceCurvature(A)
     return [lrc[i][j] for i, j in edge_pairs]
 
 
+def request_server_curvatures(server, node_count, edge_pairs, measures, idleness, bakry_dim):
+    payload = {
+        "graphs": [{"id": "0", "n": node_count, "edges": edge_pairs}],
+        "measures": measures,
+        "idleness": idleness,
+        "dimension": bakry_dim,
+    }
+    request = urllib.request.Request(
+        server.rstrip("/") + "/batch",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        body = json.load(response)
+    if "error" in body:
+        raise RuntimeError(f"server error: {body['error']}")
+    graph = body["graphs"][0]
+    if graph["errors"]:
+        raise RuntimeError(f"server error: {graph['errors']}")
+    # The server returns edges canonicalised as sorted (i, j) with i < j, which is
+    # the same order build_adjacency produces.
+    return graph["edge"], graph["vertex"]
+
+
+PREFIX_ORDER = [
+    ("orc", "edge"),
+    ("orc_idl", "edge"),
+    ("lly", "edge"),
+    ("nnlly", "edge"),
+    ("orc_sk", "edge"),
+    ("orc_idl_sk", "edge"),
+    ("be_non_norm", "node"),
+    ("be_norm", "node"),
+    ("be_non_norm_dim", "node"),
+    ("be_norm_dim", "node"),
+    ("steiner", "node"),
+    ("node_res", "node"),
+    ("link_res", "edge"),
+]
+BAKRY_PREFIXES = ("be_non_norm", "be_norm", "be_non_norm_dim", "be_norm_dim")
+# Computed locally even with --gcs-server, which has no Sinkhorn backend.
+SINKHORN_PREFIXES = ("orc_sk", "orc_idl_sk")
+
+_GCS_MODULES = None
+
+
+def gcs_modules():
+    # Loaded once per process; the server backend never needs them.
+    global _GCS_MODULES
+    if _GCS_MODULES is None:
+        _GCS_MODULES = load_gcs_modules()
+    return _GCS_MODULES
+
+
+def enabled_prefixes(settings):
+    return [prefix for prefix, _ in PREFIX_ORDER if settings["compute_flags"].get(prefix)]
+
+
+def measure_key(prefix, settings):
+    # Identifies one (measure, parameters) result, so batch jobs that differ
+    # only in unrelated options share it.
+    if prefix == "orc_idl":
+        return prefix, settings["idleness"]
+    if prefix in SINKHORN_PREFIXES:
+        idleness = settings["idleness"] if prefix == "orc_idl_sk" else 0.0
+        return (prefix, idleness) + tuple(sorted(settings["sinkhorn"].items()))
+    if prefix in BAKRY_PREFIXES:
+        dimension = settings["bakry_dimension"] if prefix.endswith("_dim") else None
+        if settings["bakry_mode"] == "sign":
+            return prefix, "sign", dimension, tuple(settings["bakry_thresholds"])
+        return prefix, "full", dimension
+    return (prefix,)
+
+
+def compute_prefix(prefix, A, edge_pairs, settings):
+    # Local computation of one measure; the GCS modules are only loaded when a
+    # vendored function is needed.
+    if prefix in SINKHORN_PREFIXES:
+        idleness = settings["idleness"] if prefix == "orc_idl_sk" else 0.0
+        return ollivier_sinkhorn(A, edge_pairs, idleness, **settings["sinkhorn"])
+    if prefix in BAKRY_PREFIXES and settings["bakry_mode"] == "sign":
+        dimension = settings["bakry_dimension"] if prefix.endswith("_dim") else float("inf")
+        normalised = prefix.startswith("be_norm")
+        return sign_features(A, prefix, dimension, normalised, settings["bakry_thresholds"])
+    gcs_curv, gcs_graph = gcs_modules()
+    if prefix == "link_res":
+        return compute_link_resistance(edge_pairs, A, gcs_curv)
+    if dict(PREFIX_ORDER)[prefix] == "edge":
+        return compute_edge_curvatures(edge_pairs, A, gcs_graph, settings["idleness"], {prefix: True})[prefix]
+    return compute_vertex_curvatures(A, gcs_curv, {prefix: True}, settings["bakry_dimension"])[prefix]
+
+
+def request_server_prefixes(prefixes, node_list, edge_pairs, settings):
+    edge_curv, vertex_curv = request_server_curvatures(
+        settings["gcs_server"],
+        len(node_list),
+        edge_pairs,
+        prefixes,
+        settings["idleness"],
+        settings["bakry_dimension"],
+    )
+    # Measures the server does not return are left out of the features.
+    return {prefix: edge_curv.get(prefix, vertex_curv.get(prefix)) for prefix in prefixes}
+
+
+def prefix_features(prefix, result, settings):
+    if prefix in SINKHORN_PREFIXES:
+        values, bounds = result
+        features = summarize(values, prefix)
+        features.update(summarize_errors(bounds, prefix))
+        return features
+    if prefix in BAKRY_PREFIXES and settings["bakry_mode"] == "sign":
+        return result
+    features = summarize(result, prefix)
+    if prefix in BAKRY_PREFIXES:
+        features.update(threshold_fractions(result, prefix, settings["bakry_thresholds"]))
+    return features
+
+
+def network_features(row, edges, graph, settings, cache):
+    A, node_list, edge_pairs = graph
+    prefixes = enabled_prefixes(settings)
+    server = [] if not settings["gcs_server"] else [p for p in prefixes if p not in SINKHORN_PREFIXES]
+    name = row.get("name", "")
+    profile = settings["profile"]
+    missing = [p for p in server if measure_key(p, settings) not in cache]
+    if missing:
+        results = profiled_call(
+            profile, name, "server", request_server_prefixes, missing, node_list, edge_pairs, settings
+        )
+        for prefix, result in results.items():
+            cache[measure_key(prefix, settings)] = result
+    for prefix in prefixes:
+        key = measure_key(prefix, settings)
+        if key not in cache:
+            cache[key] = profiled_call(
+                profile, name, measure_label(key), compute_prefix, prefix, A, edge_pairs, settings
+            )
+    if settings["with_baseline"] and ("baseline",) not in cache:
+        cache[("baseline",)] = profiled_call(profile, name, "baseline", baseline_features, edges)[0]
+
+    features = {
+        "name": name,
+        "type": row.get("type", ""),
+        "interaction_type": row.get("interaction_type", ""),
+        "interaction_subtype": row.get("interaction_subtype", ""),
+        "node_count": len(node_list),
+        "edge_count": len(edge_pairs),
+    }
+    for prefix in prefixes:
+        result = cache[measure_key(prefix, settings)]
+        if result is not None:
+            features.update(prefix_features(prefix, result, settings))
+    if settings["with_baseline"]:
+        features.update(cache[("baseline",)])
+    return features
+
+
+def load_network(job):
+    """
+    Read and parse the network of a (row, settings) or (row, [settings, ...])
+    job. The adjacency is only built if some settings will use it.
+    """
+    row, settings = job[:2]
+    settings_list = settings if isinstance(settings, list) else [settings]
+    nodes, edges = load_edgelist(row.get("file_path", ""))
+    graph = None
+    if nodes and any(not s["max_edges"] or len(edges) <= s["max_edges"] for s in settings_list):
+        graph = build_adjacency(nodes, edges)
+    return nodes, edges, graph
+
+
+def process_network_batch(job):
+    """
+    Compute features of one network for several settings (batch jobs).
+    The edgelist is read and the adjacency built once, and each
+    (measure, parameters) result is computed once and shared.
+    Returns one (status, features) pair per settings entry.
+    """
+    row, settings_list = job[:2]
+    name = row.get("name", "")
+    # A prefetching loader appends the parsed network to the job.
+    nodes, edges, graph = job[2] if len(job) > 2 else load_network(job)
+    cache = {}
+    outcomes = []
+    for settings in settings_list:
+        if settings["max_edges"] and len(edges) > settings["max_edges"]:
+            outcomes.append(("too_large", None))
+            continue
+        if not nodes:
+            outcomes.append(("empty", None))
+            continue
+        try:
+            outcomes.append(("ok", network_features(row, edges, graph, settings, cache)))
+        except Exception as exc:
+            print(f"error computing curvature for {name}: {exc}", file=sys.stderr)
+            outcomes.append(("curvature_error", None))
+    return outcomes
+
+
+def process_network(job):
+    row, settings = job[:2]
+    return process_network_batch((row, [settings]) + tuple(job[2:]))[0]
+
+
+def job_config(args):
+    """Return (settings, output_fields, local_measures) for one set of options."""
+    include_ollivier = args.full and not args.no_ollivier
+    include_lly = args.full and not args.no_lly
+    compute_flags = {
+        "orc": include_ollivier,
+        "orc_idl": include_ollivier and args.with_ollivier_idleness,
+        "lly": include_lly,
+        "nnlly": include_lly and args.with_nonnorm_lly,
+        "orc_sk": args.orc_approx,
+        "orc_idl_sk": args.orc_approx and args.with_ollivier_idleness,
+        "be_non_norm": not args.no_bakry,
+        "be_norm": not args.no_bakry,
+        "be_non_norm_dim": not args.no_bakry and args.bakry_dimension,
+        "be_norm_dim": not args.no_bakry and args.bakry_dimension,
+        "steiner": args.with_steiner,
+        "node_res": args.with_resistance,
+        "link_res": args.with_resistance,
+    }
+    server_measures = [key for key, enabled in compute_flags.items() if enabled and key not in SINKHORN_PREFIXES]
+
+    settings = {
+        "max_edges": args.max_edges,
+        "idleness": args.idleness,
+        "bakry_dimension": args.bakry_dimension,
+        "compute_flags": compute_flags,
+        "gcs_server": args.gcs_server,
+        "with_baseline": args.with_baseline,
+        "bakry_mode": args.bakry_mode,
+        "bakry_thresholds": args.bakry_thresholds,
+        "sinkhorn": {"reg": args.sinkhorn_reg, "tol": args.sinkhorn_tol, "max_iter": args.sinkhorn_max_iter},
+        "profile": profile_settings(args),
+    }
+    local_measures = [] if args.gcs_server else list(server_measures)
+    local_measures += [prefix for prefix in SINKHORN_PREFIXES if compute_flags[prefix]]
+    if args.bakry_mode == "sign" and any(m in BAKRY_PREFIXES for m in local_measures):
+        local_measures = [m for m in local_measures if m not in BAKRY_PREFIXES] + ["be_sign"]
+    if args.with_baseline:
+        local_measures.append("baseline")
+
+    output_fields = [
+        "name",
+        "type",
+        "interaction_type",
+        "interaction_subtype",
+        "node_count",
+        "edge_count",
+    ]
+
+    for prefix in enabled_prefixes(settings):
+        if prefix in BAKRY_PREFIXES and args.bakry_mode == "sign":
+            output_fields.extend(sign_fields(prefix, args.bakry_thresholds))
+            continue
+        output_fields.extend(
+            [
+                f"{prefix}_count",
+                f"{prefix}_mean",
+                f"{prefix}_std",
+                f"{prefix}_min",
+                f"{prefix}_max",
+                f"{prefix}_q05",
+                f"{prefix}_q50",
+                f"{prefix}_q95",
+                f"{prefix}_neg_frac",
+            ]
+        )
+        if prefix in BAKRY_PREFIXES:
+            output_fields.extend(threshold_fields(prefix, args.bakry_thresholds))
+        if prefix in SINKHORN_PREFIXES:
+            output_fields.extend(error_fields(prefix))
+
+    if args.with_baseline:
+        output_fields.extend(BASELINE_FIELDS)
+    return settings, output_fields, local_measures
+
+
+def check_options(args, parser, label=""):
+    if args.bakry_mode == "sign" and args.gcs_server:
+        parser.error(f"{label}--bakry-mode sign is computed locally and cannot be combined with --gcs-server")
+    if args.sinkhorn_reg < MIN_REG:
+        parser.error(f"{label}--sinkhorn-reg must be >= {MIN_REG}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Compute curvature features using graph-curvature-server backend."
@@ -162,7 +495,8 @@ def main():
         default="",
         help="Optional split set to filter (train/test)",
     )
-    parser.add_argument(
+    execution_option(
+        parser,
         "--output",
         default="data/features/curvature_features_gcs.csv",
         help="Output CSV path",
@@ -186,6 +520,13 @@ def main():
         default=0,
         help="Limit number of networks processed (0=disable)",
     )
+    execution_option(
+        parser,
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Process only shard i of N (0-based, e.g. 0/4); writes a per-shard output and manifest",
+    )
     parser.add_argument(
         "--full",
         action="store_true",
@@ -201,158 +542,169 @@ def main():
         action="store_true",
         help="Skip Lin-Lu-Yau (only relevant with --full).",
     )
+    parser.add_argument(
+        "--orc-approx",
+        action="store_true",
+        help="Add batched Sinkhorn approximations of Ollivier-Ricci (orc_sk, orc_idl_sk) with per-edge error bounds",
+    )
+    parser.add_argument(
+        "--sinkhorn-reg",
+        type=float,
+        default=0.05,
+        help=f"Entropic regularisation for --orc-approx (>= {MIN_REG})",
+    )
+    parser.add_argument("--sinkhorn-tol", type=float, default=1e-6, help="Marginal L1 tolerance for --orc-approx")
+    parser.add_argument("--sinkhorn-max-iter", type=int, default=2000, help="Iteration cap for --orc-approx")
     parser.add_argument("--no-bakry", action="store_true", help="Skip Bakry-Emery")
+    parser.add_argument(
+        "--bakry-mode",
+        choices=["full", "sign"],
+        default="full",
+        help="full: curvature summaries via eigenvalues; sign: only pos/zero/neg and threshold fractions (faster)",
+    )
+    parser.add_argument(
+        "--bakry-thresholds",
+        type=parse_thresholds,
+        default=[],
+        help="Comma-separated curvature thresholds k, negatives as m0.5; adds *_ge_<k>_frac columns for Bakry-Emery",
+    )
     parser.add_argument("--with-steiner", action="store_true", help="Include Steinerberger")
     parser.add_argument("--with-resistance", action="store_true", help="Include resistance curvature")
     parser.add_argument(
         "--with-ollivier-idleness",
         action="store_true",
-        help="Include lazy Ollivier-Ricci curvature (slow, requires --full).",
+        help="Include lazy Ollivier-Ricci curvature (slow, requires --full or --orc-approx).",
     )
     parser.add_argument(
         "--with-nonnorm-lly",
         action="store_true",
         help="Include non-normalised Lin-Lu-Yau curvature (slow, requires --full).",
     )
+    parser.add_argument(
+        "--with-baseline",
+        action="store_true",
+        help="Also compute the Python baseline features (see compute_baseline_features.py)",
+    )
+    execution_option(
+        parser,
+        "--gcs-server",
+        default="",
+        help="Offload curvature to a running graph-curvature-server /batch endpoint (e.g. http://localhost:8090)",
+    )
+    add_scheduler_arguments(parser)
+    add_batch_argument(parser)
+    add_prefetch_argument(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
-
-    split_filter = {}
-    if args.split:
-        with open(args.split, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                if args.split_set and row.get("split") != args.split_set:
-                    continue
-                split_filter[row.get("name", "")] = row
+    check_blas_control(args)
+    if args.profile_names and not args.profile:
+        parser.error("--profile-names requires --profile")
+    check_options(args, parser)
+
+    if args.batch:
+        if args.shard:
+            parser.error("--batch cannot be combined with --shard")
+        jobs = batch_jobs_or_exit(args, parser)
+        for job in jobs:
+            check_options(job, parser, f"{job.output}: ")
+        if not args.gcs_server:
+            gcs_modules()
+        run_batch(args, jobs, [job_config(job) for job in jobs], process_network_batch, load_network)
+        return
+
+    split_filter = read_split_filter(args.split, args.split_set)
 
     with open(args.dataset_index, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         index_rows = list(reader)
 
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    output_path = args.output
+    assigned = set()
+    if args.shard:
+        candidates = select_candidates(index_rows, split_filter)
+        assignment = assign_shards(candidates, args.shard[1])
+        index_rows = [row for row in candidates if assignment[row.get("name", "")] == args.shard[0]]
+        assigned = {row.get("name", "") for row in index_rows}
+        output_path = shard_output_path(args.output, args.shard)
 
-    include_ollivier = args.full and not args.no_ollivier
-    include_lly = args.full and not args.no_lly
-    compute_flags = {
-        "orc": include_ollivier,
-        "orc_idl": include_ollivier and args.with_ollivier_idleness,
-        "lly": include_lly,
-        "nnlly": include_lly and args.with_nonnorm_lly,
-        "be_non_norm": not args.no_bakry,
-        "be_norm": not args.no_bakry,
-        "be_non_norm_dim": not args.no_bakry and args.bakry_dimension,
-        "be_norm_dim": not args.no_bakry and args.bakry_dimension,
-        "steiner": args.with_steiner,
-        "node_res": args.with_resistance,
-    }
-    compute_link_res = args.with_resistance
-
-    gcs_curv, gcs_graph = load_gcs_modules()
-
-    output_fields = [
-        "name",
-        "type",
-        "interaction_type",
-        "interaction_subtype",
-        "node_count",
-        "edge_count",
-    ]
-
-    prefix_order = [
-        ("orc", "edge"),
-        ("orc_idl", "edge"),
-        ("lly", "edge"),
-        ("nnlly", "edge"),
-        ("be_non_norm", "node"),
-        ("be_norm", "node"),
-        ("be_non_norm_dim", "node"),
-        ("be_norm_dim", "node"),
-        ("steiner", "node"),
-        ("node_res", "node"),
-        ("link_res", "edge"),
-    ]
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
 
-    for prefix, _ in prefix_order:
-        if prefix == "link_res" and not compute_link_res:
-            continue
-        if not compute_flags.get(prefix, False) and prefix != "link_res":
-            continue
-        output_fields.extend(
-            [
-                f"{prefix}_count",
-                f"{prefix}_mean",
-                f"{prefix}_std",
-                f"{prefix}_min",
-                f"{prefix}_max",
-                f"{prefix}_q05",
-                f"{prefix}_q50",
-                f"{prefix}_q95",
-                f"{prefix}_neg_frac",
-            ]
-        )
+    settings, output_fields, local_measures = job_config(args)
+    if not args.gcs_server:
+        # Fail before scheduling anything; forked workers inherit the modules.
+        gcs_modules()
 
     processed = 0
     skipped = defaultdict(int)
-
-    with open(args.output, "w", newline="", encoding="utf-8") as f:
+    processed_names = []
+    skipped_names = {}
+
+    model = memory_model(args)
+    tasks = []
+    for row in index_rows:
+        name = row.get("name", "")
+        if split_filter and name not in split_filter:
+            continue
+        if missing_path(row):
+            skipped["missing_path"] += 1
+            skipped_names[name] = "missing_path"
+            continue
+        estimates = row_estimates(row, local_measures, args.max_edges)
+        threads = blas_threads(args.blas_strategy, args.cores, args.blas_min_nodes, row, local_measures)
+        tasks.append(Task(len(tasks), (row, settings), name, estimates, model, threads))
+
+    observations = []
+    stats = PipelineStats(args.prefetch)
+    profile_started = time.time()
+    started = time.perf_counter()
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=output_fields)
         writer.writeheader()
 
-        for row in index_rows:
-            name = row.get("name", "")
-            if split_filter and name not in split_filter:
-                continue
-            if row.get("path_status") in {"missing", "ambiguous", "normalized_ambiguous"}:
-                skipped["missing_path"] += 1
-                continue
-            path = row.get("file_path", "")
-            if not path or not os.path.exists(path):
-                skipped["missing_path"] += 1
-                continue
-
-            nodes, edges = load_edgelist(path)
-            edge_count = len(edges)
-            if args.max_edges and edge_count > args.max_edges:
-                skipped["too_large"] += 1
-                continue
-
-            if not nodes:
-                skipped["empty"] += 1
-                continue
-
-            try:
-                A, node_list, edge_pairs = build_adjacency(nodes, edges)
-                edge_curv = compute_edge_curvatures(edge_pairs, A, gcs_graph, args.idleness, compute_flags)
-                vertex_curv = compute_vertex_curvatures(A, gcs_curv, compute_flags, args.bakry_dimension)
-                if compute_link_res:
-                    edge_curv["link_res"] = compute_link_resistance(edge_pairs, A, gcs_curv)
-            except Exception as exc:
-                skipped["curvature_error"] += 1
-                print(f"error computing curvature for {name}: {exc}", file=sys.stderr)
-                continue
-
-            features = {
-                "name": name,
-                "type": row.get("type", ""),
-                "interaction_type": row.get("interaction_type", ""),
-                "interaction_subtype": row.get("interaction_subtype", ""),
-                "node_count": len(node_list),
-                "edge_count": len(edge_pairs),
-            }
-
-            for prefix, _ in prefix_order:
-                if prefix == "link_res" and not compute_link_res:
+        cores = args.cores if args.blas_strategy else 0
+        results = scheduled_map(
+            process_network,
+            staged_tasks(tasks, load_network, args, stats),
+            args.workers,
+            args.memory_limit,
+            model,
+            observations,
+            cores,
+        )
+        with contextlib.closing(results), WriteStage(args.prefetch, stats) as output:
+            for task, (status, features) in results:
+                if status != "ok":
+                    skipped[status] += 1
+                    skipped_names[task.label] = status
                     continue
-                if prefix in edge_curv:
-                    features.update(summarize(edge_curv[prefix], prefix))
-                elif prefix in vertex_curv:
-                    features.update(summarize(vertex_curv[prefix], prefix))
-
-            writer.writerow(features)
-            processed += 1
 
-            if args.limit and processed >= args.limit:
-                break
+                output.put(writer.writerow, features)
+                processed += 1
+                processed_names.append(task.label)
+
+                if args.limit and processed >= args.limit:
+                    break
+
+    model.save()
+    wall = time.perf_counter() - started
+    if args.blas_strategy or args.workers > 1:
+        for line in throughput_report(observations, wall, args.blas_strategy):
+            print(line)
+    if args.prefetch:
+        stats.observe_compute(observations)
+        for line in stats.report(wall):
+            print(line)
+    if args.memory_log:
+        write_memory_log(args.memory_log, observations)
+    if args.profile:
+        for line in summarize_profiles(args.profile, profile_started):
+            print(line)
+
+    if args.shard:
+        if args.limit and processed >= args.limit:
+            skipped["limit"] += record_limit_skips(assigned, processed_names, skipped_names)
+        manifest = build_manifest(args, args.shard, output_path, assigned, processed_names, skipped_names)
+        print("manifest written to", write_manifest(output_path, manifest))
 
     print("processed", processed)
     for key, val in skipped.items():
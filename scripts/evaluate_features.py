@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import csv
+import math
+import os
+import random
+import re
+import sys
+
+import numpy as np
+
+from build_splits import stratified_split
+from compute_baseline_features import BASELINE_FIELDS
+
+
+# Repeated stratified hold-out evaluation of feature tables. Replicate r
+# re-splits the task's networks with build_splits.stratified_split seeded by
+# seed + r. All replicates of a (subset, classifier) pair are fitted at once on
+# (replicates, networks, features) tensors; pairs run in parallel processes.
+#
+# Columns are addressed as <source>.<column>, where the source is the name given
+# to each --features table. Subsets select columns by regex.
+DEFAULT_FEATURES = [
+    "grc=data/features/curvature_features.csv",
+    "gcs=data/features/curvature_features_gcs.csv",
+    "baseline=data/features/baseline_features.csv",
+]
+# Per-edge measures also write *_count (the edge count), a size column rather
+# than a curvature feature, and the Sinkhorn measures write *_err_mean/_err_max,
+# the solver's approximation error; the curvature subsets leave both out.
+DEFAULT_SUBSETS = [
+    r"orc=\.(?!.*(_count|_err_(mean|max))$)orc_",
+    r"forman=\.(?!.*_count$)frc_",
+    "baseline=^baseline\\.|\\.(" + "|".join(BASELINE_FIELDS) + ")$",
+    "combined=.",
+]
+CLASSIFIERS = ("logistic", "centroid")
+META_FIELDS = {
+    "name",
+    "type",
+    "type_raw",
+    "randomization",
+    "interaction_type",
+    "interaction_subtype",
+    "split",
+    "label",
+    "task",
+}
+# Caps each (replicates, networks, features) chunk at ~32 MB per float tensor.
+CHUNK_ELEMENTS = 1 << 22
+
+
+def parse_assignment(value):
+    name, sep, rest = value.partition("=")
+    if not sep or not name or not rest:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {value!r}")
+    return name, rest
+
+
+def to_float(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+def load_table(source, path):
+    """Return ({name: row}, numeric feature columns) for one feature CSV."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    if rows and "randomization" in rows[0]:
+        # R baseline exports hold one row per randomization; keep the empirical one.
+        rows = [row for row in rows if row.get("randomization") == "empirical"]
+    by_name = {}
+    duplicates = 0
+    for row in rows:
+        name = row.get("name", "")
+        if name in by_name:
+            duplicates += 1
+            continue
+        by_name[name] = row
+    if duplicates:
+        print(f"warning: {path}: {duplicates} duplicate names; kept the first row of each", file=sys.stderr)
+    columns = []
+    for column in rows[0].keys() if rows else []:
+        if column in META_FIELDS:
+            continue
+        values = [row.get(column, "") for row in rows]
+        if any(not math.isnan(to_float(v)) for v in values) and all(
+            v in ("", "NA") or not math.isnan(to_float(v)) for v in values
+        ):
+            columns.append(column)
+    return by_name, [(f"{source}.{column}", column) for column in columns]
+
+
+def load_features(specs, names):
+    """
+    Join the feature tables on network name. Returns (kept names, feature
+    names, X) with NaN for missing values; networks absent from any table are
+    dropped.
+    """
+    tables = []
+    for source, path in specs:
+        if not os.path.exists(path):
+            print(f"warning: {path} not found; skipping {source}", file=sys.stderr)
+            continue
+        tables.append(load_table(source, path))
+    if not tables:
+        raise SystemExit("no feature tables found")
+    kept = [name for name in names if all(name in by_name for by_name, _ in tables)]
+    feature_names = [key for _, columns in tables for key, _ in columns]
+    X = np.array(
+        [[to_float(by_name[name].get(column)) for by_name, columns in tables for _, column in columns] for name in kept],
+        dtype=float,
+    ).reshape(len(kept), len(feature_names))
+    return kept, feature_names, X
+
+
+def subset_columns(pattern, feature_names):
+    return [i for i, feature in enumerate(feature_names) if pattern.search(feature)]
+
+
+def replicate_masks(names, labels, replicates, seed, test_fraction):
+    # One stratified split per replicate, drawn with build_splits.stratified_split.
+    rows = [{"name": name, "label": label} for name, label in zip(names, labels)]
+    position = {name: i for i, name in enumerate(names)}
+    train = np.zeros((replicates, len(names)), dtype=bool)
+    for r in range(replicates):
+        split_rows, _ = stratified_split(rows, lambda row: row["label"], random.Random(seed + r), test_fraction)
+        for row, _, split in split_rows:
+            train[r, position[row["name"]]] = split == "train"
+    return train
+
+
+def standardize(X, train):
+    """
+    Per-replicate z-scores from training rows; missing values become the
+    training mean (0). Returns a (replicates, networks, features) tensor.
+    """
+    present = ~np.isnan(X)
+    X0 = np.where(present, X, 0.0)
+    weight = (train[:, :, None] & present[None]).astype(float)
+    counts = np.maximum(weight.sum(axis=1), 1)
+    mean = np.einsum("rnd,nd->rd", weight, X0) / counts
+    centred = X0[None] - mean[:, None, :]
+    std = np.sqrt(np.einsum("rnd,rnd->rd", weight, centred ** 2) / counts)
+    std[std == 0] = 1.0
+    Z = centred / std[:, None, :]
+    Z[:, ~present] = 0.0
+    return Z
+
+
+def fit_logistic(Z, Y, train, l2, max_iter):
+    """
+    Multinomial logistic regression with L2 penalty, fitted for all replicates
+    at once by accelerated gradient descent with step 1/L. Returns weights
+    (replicates, features + 1, classes), intercept last.
+    """
+    R, n, _ = Z.shape
+    Z1 = np.concatenate([Z, np.ones((R, n, 1))], axis=2)
+    w = train / train.sum(axis=1, keepdims=True)
+    gram = np.einsum("rn,rni,rnj->rij", w, Z1, Z1)
+    # Softmax cross-entropy has curvature at most 1/2 along any direction.
+    L = 0.5 * np.linalg.eigvalsh(gram)[:, -1] + l2
+    penalty = np.ones(Z1.shape[2])
+    penalty[-1] = 0.0
+    W = np.zeros((R, Z1.shape[2], Y.shape[1]))
+    V = W
+    t = 1.0
+    for _ in range(max_iter):
+        logits = Z1 @ V
+        logits -= logits.max(axis=2, keepdims=True)
+        P = np.exp(logits)
+        P /= P.sum(axis=2, keepdims=True)
+        G = np.einsum("rni,rnk->rik", Z1, (P - Y[None]) * w[:, :, None]) + l2 * V * penalty[None, :, None]
+        W_next = V - G / L[:, None, None]
+        t_next = (1 + math.sqrt(1 + 4 * t * t)) / 2
+        V = W_next + (t - 1) / t_next * (W_next - W)
+        W, t = W_next, t_next
+    return W
+
+
+def predict_logistic(Z, W):
+    R, n, _ = Z.shape
+    return np.argmax(np.concatenate([Z, np.ones((R, n, 1))], axis=2) @ W, axis=2)
+
+
+def predict_centroid(Z, Y, train):
+    # Class means of the training rows; absent classes are never predicted.
+    weight = train[:, :, None] * Y[None]
+    counts = weight.sum(axis=1)
+    centroids = np.einsum("rnk,rnd->rkd", weight, Z) / np.maximum(counts, 1)[:, :, None]
+    distances = (
+        np.einsum("rnd,rnd->rn", Z, Z)[:, :, None]
+        - 2 * np.einsum("rnd,rkd->rnk", Z, centroids)
+        + np.einsum("rkd,rkd->rk", centroids, centroids)[:, None, :]
+    )
+    distances[np.broadcast_to(counts[:, None, :] == 0, distances.shape)] = np.inf
+    return np.argmin(distances, axis=2)
+
+
+def scores(predicted, y, test):
+    # Accuracy and balanced accuracy (mean recall over classes in the test set).
+    correct = (predicted == y[None]) & test
+    accuracy = correct.sum(axis=1) / np.maximum(test.sum(axis=1), 1)
+    recalls = []
+    for k in np.unique(y):
+        in_class = test & (y[None] == k)
+        total = in_class.sum(axis=1)
+        recalls.append(np.where(total > 0, (correct & in_class).sum(axis=1) / np.maximum(total, 1), np.nan))
+    return accuracy, np.nanmean(np.array(recalls), axis=0)
+
+
+def evaluate(job):
+    """Score one (subset, classifier) pair on every replicate."""
+    X, y, train, classifier, l2, max_iter = job
+    Y = np.eye(int(y.max()) + 1)[y]
+    accuracy = np.zeros(len(train))
+    balanced = np.zeros(len(train))
+    step = max(1, CHUNK_ELEMENTS // max(1, X.size))
+    for start in range(0, len(train), step):
+        part = train[start:start + step]
+        Z = standardize(X, part)
+        if classifier == "logistic":
+            predicted = predict_logistic(Z, fit_logistic(Z, Y, part, l2, max_iter))
+        else:
+            predicted = predict_centroid(Z, Y, part)
+        accuracy[start:start + step], balanced[start:start + step] = scores(predicted, y, ~part)
+    return accuracy, balanced
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q * 100)) if len(values) else math.nan
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Accuracy distributions of feature subsets over repeated seeded stratified splits."
+    )
+    parser.add_argument(
+        "--split",
+        default="data/splits/mutualism_vs_antagonism_split.csv",
+        help="Split CSV (from build_splits.py) giving the task's networks and labels",
+    )
+    parser.add_argument(
+        "--features",
+        type=parse_assignment,
+        action="append",
+        help="Feature table as SOURCE=PATH, repeatable (default: grc, gcs and baseline tables under data/features)",
+    )
+    parser.add_argument(
+        "--subset",
+        type=parse_assignment,
+        action="append",
+        help="Feature subset as NAME=REGEX over SOURCE.COLUMN, repeatable (default: orc, forman, baseline, combined)",
+    )
+    parser.add_argument("--classifiers", default=",".join(CLASSIFIERS), help="Comma-separated: logistic, centroid")
+    parser.add_argument("--replicates", type=int, default=100, help="Number of seeded split replicates")
+    parser.add_argument("--seed", type=int, default=7, help="Seed of the first replicate")
+    parser.add_argument("--test-fraction", type=float, default=0.2, help="Test fraction")
+    parser.add_argument("--l2", type=float, default=1e-2, help="L2 penalty of the logistic regression")
+    parser.add_argument("--max-iter", type=int, default=300, help="Gradient steps of the logistic regression")
+    parser.add_argument("--workers", type=int, default=1, help="(subset, classifier) pairs evaluated in parallel")
+    parser.add_argument("--output", default="", help="Optional CSV of per-replicate scores")
+    parser.add_argument("--summary", default="", help="Optional CSV of score distributions")
+    args = parser.parse_args()
+
+    classifiers = [c for c in args.classifiers.split(",") if c]
+    unknown = sorted(set(classifiers) - set(CLASSIFIERS))
+    if unknown:
+        parser.error(f"unknown classifiers {unknown}; choose from {', '.join(CLASSIFIERS)}")
+    subsets = args.subset or [parse_assignment(value) for value in DEFAULT_SUBSETS]
+    try:
+        patterns = [(name, re.compile(pattern)) for name, pattern in subsets]
+    except re.error as exc:
+        parser.error(f"invalid --subset pattern: {exc}")
+
+    with open(args.split, newline="", encoding="utf-8") as f:
+        split_rows = [row for row in csv.DictReader(f) if row.get("label")]
+    names, labels = [], []
+    for row in split_rows:
+        if row.get("name", "") not in names:
+            names.append(row.get("name", ""))
+            labels.append(row["label"])
+
+    specs = args.features or [parse_assignment(value) for value in DEFAULT_FEATURES]
+    kept, feature_names, X = load_features(specs, names)
+    label_of = dict(zip(names, labels))
+    classes = sorted({label_of[name] for name in kept})
+    if len(classes) < 2:
+        raise SystemExit(f"need at least two labels among the {len(kept)} networks with features")
+    y = np.array([classes.index(label_of[name]) for name in kept])
+    train = replicate_masks(kept, [label_of[name] for name in kept], args.replicates, args.seed, args.test_fraction)
+    print(
+        f"{len(kept)} of {len(names)} networks have features; labels "
+        + ", ".join(f"{label}={int((y == k).sum())}" for k, label in enumerate(classes))
+    )
+
+    jobs = []
+    for subset, pattern in patterns:
+        columns = subset_columns(pattern, feature_names)
+        if not columns:
+            print(f"warning: subset {subset} matches no columns; skipped", file=sys.stderr)
+            continue
+        for classifier in classifiers:
+            jobs.append((subset, classifier, len(columns), (X[:, columns], y, train, classifier, args.l2, args.max_iter)))
+
+    if args.workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(evaluate, [job[-1] for job in jobs]))
+    else:
+        results = [evaluate(job[-1]) for job in jobs]
+
+    n_test = (~train).sum(axis=1)
+    replicate_rows = []
+    summary_rows = []
+    for (subset, classifier, n_features, _), (accuracy, balanced) in zip(jobs, results):
+        for r in range(args.replicates):
+            replicate_rows.append(
+                {
+                    "subset": subset,
+                    "classifier": classifier,
+                    "replicate": r,
+                    "seed": args.seed + r,
+                    "n_features": n_features,
+                    "n_train": len(kept) - int(n_test[r]),
+                    "n_test": int(n_test[r]),
+                    "accuracy": round(float(accuracy[r]), 6),
+                    "balanced_accuracy": round(float(balanced[r]), 6),
+                }
+            )
+        summary = {"subset": subset, "classifier": classifier, "n_features": n_features}
+        for metric, values in (("accuracy", accuracy), ("balanced_accuracy", balanced)):
+            summary.update(
+                {
+                    f"{metric}_mean": round(float(values.mean()), 6),
+                    f"{metric}_std": round(float(values.std()), 6),
+                    f"{metric}_q05": round(percentile(values, 0.05), 6),
+                    f"{metric}_q50": round(percentile(values, 0.50), 6),
+                    f"{metric}_q95": round(percentile(values, 0.95), 6),
+                }
+            )
+        summary_rows.append(summary)
+
+    print(f"{'subset':<12} {'classifier':<10} {'features':>8} {'accuracy':>17} {'balanced':>17} {'q05-q95':>13}")
+    for summary in summary_rows:
+        print(
+            f"{summary['subset']:<12} {summary['classifier']:<10} {summary['n_features']:>8} "
+            f"{summary['accuracy_mean']:>8.3f} ± {summary['accuracy_std']:<6.3f} "
+            f"{summary['balanced_accuracy_mean']:>8.3f} ± {summary['balanced_accuracy_std']:<6.3f} "
+            f"{summary['accuracy_q05']:>6.3f}-{summary['accuracy_q95']:.3f}"
+        )
+
+    for path, rows in ((args.output, replicate_rows), (args.summary, summary_rows)):
+        if not path or not rows:
+            continue
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+        print("wrote", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import datetime
+import hashlib
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+from sharding import file_sha256
+
+
+# Layout (every part is immutable once renamed into place):
+#   <store>/exp_id=<exp>/backend=<backend>/part-<utc>-<n>/{schema.json,<column>.npy}
+#   <store>/snapshots/<name>.json
+DEFAULT_STORE = "data/feature_store"
+KEY_COLUMNS = ("name", "type")
+# Extra key columns used when a table has them: the R baseline export has one
+# row per (name, type, randomization).
+OPTIONAL_KEY_COLUMNS = ("randomization",)
+# The R export rewrites `type` (ecologicalinteractions -> herbivory, ...) and
+# keeps the dataset's value in `type_raw`. Ingest stores the dataset value as
+# `type`, so baseline parts join curvature parts, and the rewrite as `type_label`.
+RAW_TYPE_COLUMN = "type_raw"
+TYPE_LABEL_COLUMN = "type_label"
+# Added by load when its parts span several partitions, so rows of different
+# experiments or backends stay apart and say where they came from.
+PARTITION_COLUMNS = ("exp_id", "backend")
+TEXT_COLUMNS = KEY_COLUMNS + OPTIONAL_KEY_COLUMNS + (TYPE_LABEL_COLUMN,) + PARTITION_COLUMNS
+SCHEMA_FILE = "schema.json"
+
+
+def column_file(column):
+    # Column names are CSV headers; keep them filesystem-safe but recognisable.
+    safe = "".join(ch if ch.isalnum() or ch in "._-" else "_" for ch in column)
+    digest = hashlib.sha1(column.encode("utf-8")).hexdigest()[:8]
+    return f"{safe}.{digest}.npy"
+
+
+def infer_column(values, text=False):
+    if text:
+        return np.array(values, dtype=str), "str"
+    if all(v != "" for v in values):
+        try:
+            return np.array([int(v) for v in values], dtype=np.int64), "int64"
+        except ValueError:
+            pass
+    try:
+        return np.array([float(v) if v != "" else math.nan for v in values], dtype=np.float64), "float64"
+    except ValueError:
+        return np.array(values, dtype=str), "str"
+
+
+def partition_dir(store, exp_id, backend):
+    return os.path.join(store, f"exp_id={exp_id}", f"backend={backend}")
+
+
+def list_parts(store, exp_id=None, backend=None):
+    parts = []
+    if not os.path.isdir(store):
+        return parts
+    for exp_entry in sorted(os.listdir(store)):
+        if not exp_entry.startswith("exp_id="):
+            continue
+        exp = exp_entry[len("exp_id="):]
+        if exp_id is not None and exp != exp_id:
+            continue
+        for backend_entry in sorted(os.listdir(os.path.join(store, exp_entry))):
+            if not backend_entry.startswith("backend="):
+                continue
+            name = backend_entry[len("backend="):]
+            if backend is not None and name != backend:
+                continue
+            root = os.path.join(store, exp_entry, backend_entry)
+            for part in sorted(os.listdir(root)):
+                path = os.path.join(root, part)
+                if part.startswith("part-") and os.path.exists(os.path.join(path, SCHEMA_FILE)):
+                    parts.append(path)
+    return parts
+
+
+def read_schema(part):
+    with open(os.path.join(part, SCHEMA_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ingest_csv(store, csv_path, exp_id, backend):
+    source_sha256 = file_sha256(csv_path)
+    for part in list_parts(store, exp_id, backend):
+        if read_schema(part).get("source_sha256") == source_sha256:
+            return part, False
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames or []
+        rows = list(reader)
+    for key in KEY_COLUMNS:
+        if key not in fieldnames:
+            raise ValueError(f"{csv_path} has no {key!r} column")
+    for column in PARTITION_COLUMNS:
+        if column in fieldnames:
+            raise ValueError(f"{csv_path} has a {column!r} column, which the store reserves")
+    if RAW_TYPE_COLUMN in fieldnames:
+        if TYPE_LABEL_COLUMN in fieldnames:
+            raise ValueError(f"{csv_path} has both {RAW_TYPE_COLUMN!r} and {TYPE_LABEL_COLUMN!r} columns")
+        for row in rows:
+            row[TYPE_LABEL_COLUMN], row["type"] = row["type"], row.pop(RAW_TYPE_COLUMN)
+        fieldnames = [TYPE_LABEL_COLUMN if c == RAW_TYPE_COLUMN else c for c in fieldnames]
+    keys = row_keys(fieldnames)
+    seen = {}
+    for line, row in enumerate(rows, start=2):
+        key = tuple(row.get(k) or "" for k in keys)
+        if key in seen:
+            raise ValueError(
+                f"{csv_path}: lines {seen[key]} and {line} share the key "
+                + ", ".join(f"{k}={v!r}" for k, v in zip(keys, key))
+            )
+        seen[key] = line
+
+    root = partition_dir(store, exp_id, backend)
+    os.makedirs(root, exist_ok=True)
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    seq = len(list_parts(store, exp_id, backend))
+    final = os.path.join(root, f"part-{stamp}-{seq:05d}")
+    tmp = os.path.join(root, f".tmp-{stamp}-{os.getpid()}")
+    os.makedirs(tmp)
+
+    columns = []
+    for column in fieldnames:
+        values = [row.get(column) or "" for row in rows]
+        array, dtype = infer_column(values, text=column in TEXT_COLUMNS)
+        filename = column_file(column)
+        np.save(os.path.join(tmp, filename), array, allow_pickle=False)
+        columns.append(
+            {
+                "name": column,
+                "dtype": dtype,
+                "file": filename,
+                "sha256": file_sha256(os.path.join(tmp, filename)),
+            }
+        )
+
+    schema = {
+        "exp_id": exp_id,
+        "backend": backend,
+        "rows": len(rows),
+        "key": list(keys),
+        "columns": columns,
+        "source": csv_path,
+        "source_sha256": source_sha256,
+        "created": stamp,
+    }
+    with open(os.path.join(tmp, SCHEMA_FILE), "w", encoding="utf-8") as f:
+        json.dump(schema, f, indent=2)
+        f.write("\n")
+    os.rename(tmp, final)
+    return final, True
+
+
+def read_part(part, columns=None, verify=False):
+    schema = read_schema(part)
+    by_name = {c["name"]: c for c in schema["columns"]}
+    key = [k for k in KEY_COLUMNS + OPTIONAL_KEY_COLUMNS if k in by_name]
+    wanted = list(by_name) if columns is None else list(dict.fromkeys(key + list(columns)))
+    table = {}
+    for column in wanted:
+        spec = by_name.get(column)
+        if spec is None:
+            continue
+        path = os.path.join(part, spec["file"])
+        if verify and file_sha256(path) != spec["sha256"]:
+            raise ValueError(f"{path} does not match its recorded checksum")
+        table[column] = np.load(path, mmap_mode="r", allow_pickle=False)
+    return table, schema
+
+
+def concat_column(arrays):
+    arrays = [np.asarray(a) for a in arrays]
+    if any(a.dtype.kind == "U" for a in arrays) and any(a.dtype.kind != "U" for a in arrays):
+        arrays = [a.astype(str) for a in arrays]
+    return np.concatenate(arrays)
+
+
+def row_keys(columns):
+    return KEY_COLUMNS + tuple(k for k in OPTIONAL_KEY_COLUMNS if k in columns)
+
+
+def key_index(table, keys=KEY_COLUMNS, unique=False):
+    # Later rows win, so an appended re-run supersedes older parts of the same
+    # partition. With unique=True a repeated key is an error instead.
+    index = {}
+    for row, key in enumerate(zip(*(table[k] for k in keys))):
+        key = tuple(str(v) for v in key)
+        if unique and key in index:
+            raise ValueError(
+                "several rows share the key "
+                + ", ".join(f"{k}={v!r}" for k, v in zip(keys, key))
+                + "; join on more columns or put this source first"
+            )
+        index[key] = row
+    return index
+
+
+def load(store=DEFAULT_STORE, exp_id=None, backend=None, columns=None, snapshot=None, verify=False):
+    if snapshot:
+        parts = [
+            os.path.join(store, entry["path"])
+            for entry in read_snapshot(store, snapshot)["parts"]
+            if (exp_id is None or entry["exp_id"] == exp_id) and (backend is None or entry["backend"] == backend)
+        ]
+    else:
+        parts = list_parts(store, exp_id, backend)
+
+    loaded = [read_part(part, columns, verify=verify) for part in parts]
+    # Re-runs only supersede rows of their own partition. When several
+    # experiments or backends are loaded, their rows are all kept and tagged.
+    tags = [column for column in PARTITION_COLUMNS if len({schema[column] for _, schema in loaded}) > 1]
+    for table, schema in loaded:
+        for column in tags:
+            table[column] = np.full(schema["rows"], schema[column])
+    wanted = list(tags)
+    for table, _ in loaded:
+        wanted.extend(c for c in table if c not in wanted)
+    keys = tuple(tags) + row_keys(wanted)
+    if columns is not None:
+        order = list(dict.fromkeys(list(keys) + list(columns)))
+        wanted = [c for c in order if c in wanted]
+    if not loaded:
+        return {column: np.array([]) for column in wanted or KEY_COLUMNS}
+
+    def missing(column, rows):
+        return np.full(rows, "") if column in TEXT_COLUMNS else np.full(rows, math.nan)
+
+    combined = {
+        column: concat_column(
+            [table[column] if column in table else missing(column, schema["rows"]) for table, schema in loaded]
+        )
+        for column in wanted
+    }
+    keep = sorted(key_index(combined, keys).values())
+    return {column: values[keep] for column, values in combined.items()}
+
+
+def join(left, right, keys=KEY_COLUMNS, suffix="_right"):
+    # Left rows are kept as they are; each right key must be unique.
+    index = key_index(right, keys, unique=True)
+    n = len(left[keys[0]])
+    positions = np.array(
+        [index.get(tuple(str(v) for v in key), -1) for key in zip(*(left[k] for k in keys))],
+        dtype=np.int64,
+    )
+    found = positions >= 0
+    out = dict(left)
+    for column, values in right.items():
+        if column in keys:
+            continue
+        name = column if column not in out else f"{column}{suffix}"
+        values = np.asarray(values)
+        if found.all():
+            out[name] = values[positions]
+            continue
+        # Unmatched rows need a NaN, so numeric columns become float only here.
+        if values.dtype.kind in "iuf":
+            joined = np.full(n, math.nan)
+        else:
+            joined = np.full(n, "", dtype=values.dtype if values.dtype.kind == "U" else str)
+        joined[found] = values[positions[found]]
+        out[name] = joined
+    return out
+
+
+def snapshot_path(store, name):
+    return os.path.join(store, "snapshots", f"{name}.json")
+
+
+def create_snapshot(store, name, exp_id=None, backend=None):
+    path = snapshot_path(store, name)
+    if os.path.exists(path):
+        raise ValueError(f"snapshot {name} already exists")
+    parts = []
+    for part in list_parts(store, exp_id, backend):
+        schema = read_schema(part)
+        parts.append(
+            {
+                "path": os.path.relpath(part, store),
+                "exp_id": schema["exp_id"],
+                "backend": schema["backend"],
+                "rows": schema["rows"],
+                "columns": {c["name"]: c["sha256"] for c in schema["columns"]},
+            }
+        )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "x", encoding="utf-8") as f:
+        json.dump({"name": name, "exp_id": exp_id, "backend": backend, "parts": parts}, f, indent=2)
+        f.write("\n")
+    return path, parts
+
+
+def read_snapshot(store, name):
+    with open(snapshot_path(store, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_table_csv(table, output):
+    columns = list(table)
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in zip(*(table[c] for c in columns)):
+            writer.writerow(["" if isinstance(v, float) and math.isnan(v) else v for v in (x.item() for x in row)])
+
+
+def parse_source(value):
+    exp_id, sep, backend = value.partition("/")
+    if not sep or not exp_id or not backend:
+        raise argparse.ArgumentTypeError(f"expected exp_id/backend, got {value!r}")
+    return exp_id, backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append-only columnar store for feature tables.")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="Feature store root")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ingest = sub.add_parser("ingest", help="Append a feature CSV as a new immutable part")
+    ingest.add_argument("csv", help="Feature CSV (must have name and type columns)")
+    ingest.add_argument("--exp-id", required=True, help="Experiment ID (see logs/experiment_log.csv)")
+    ingest.add_argument("--backend", required=True, help="Backend label, e.g. grc, gcs, baseline")
+
+    sub.add_parser("list", help="List stored parts")
+
+    snap = sub.add_parser("snapshot", help="Freeze the current parts under a name")
+    snap.add_argument("name", help="Snapshot name")
+    snap.add_argument("--exp-id", default=None, help="Only include this experiment")
+    snap.add_argument("--backend", default=None, help="Only include this backend")
+
+    export = sub.add_parser("export", help="Project and join columns into a CSV")
+    export.add_argument(
+        "--source",
+        type=parse_source,
+        action="append",
+        required=True,
+        help="exp_id/backend to load; repeat to join several on name/type (put a baseline with several randomizations first)",
+    )
+    export.add_argument("--columns", default="", help="Comma-separated columns (default: all)")
+    export.add_argument("--snapshot", default="", help="Restrict to parts in this snapshot")
+    export.add_argument("--verify", action="store_true", help="Verify column checksums")
+    export.add_argument("--output", required=True, help="Output CSV path")
+
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        part, created = ingest_csv(args.store, args.csv, args.exp_id, args.backend)
+        print("ingested" if created else "already stored", part)
+    elif args.command == "list":
+        for part in list_parts(args.store):
+            schema = read_schema(part)
+            print(f"{schema['exp_id']}\t{schema['backend']}\t{schema['rows']} rows\t{len(schema['columns'])} cols\t{part}")
+    elif args.command == "snapshot":
+        path, parts = create_snapshot(args.store, args.name, args.exp_id, args.backend)
+        print("snapshot", args.name, "with", len(parts), "parts written to", path)
+    elif args.command == "export":
+        columns = [c for c in args.columns.split(",") if c] or None
+        table = None
+        for exp_id, backend in args.source:
+            loaded = load(args.store, exp_id, backend, columns, snapshot=args.snapshot or None, verify=args.verify)
+            table = loaded if table is None else join(table, loaded, suffix=f"_{backend}")
+        if not len(table.get("name", [])):
+            print("no rows matched", file=sys.stderr)
+            sys.exit(1)
+        write_table_csv(table, args.output)
+        print("wrote", len(table["name"]), "rows to", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import glob
+import os
+import sys
+from collections import Counter, defaultdict
+
+from batch_jobs import read_split_filter
+from sharding import assign_shards, file_sha256, read_manifest, select_candidates
+
+
+def discover_manifests(output):
+    base, ext = os.path.splitext(output)
+    return sorted(glob.glob(f"{glob.escape(base)}.shard-*-of-*{glob.escape(ext)}.manifest.json"))
+
+
+def check_consistency(manifests, errors):
+    first = manifests[0]
+    count = first["shard_count"]
+    for manifest in manifests[1:]:
+        for key in ("shard_count", "dataset_index_sha256", "split_sha256", "split_set", "parameters"):
+            if manifest.get(key) != first.get(key):
+                errors.append(
+                    f"shard {manifest['shard_index']} disagrees with shard {first['shard_index']} on {key}"
+                )
+
+    indices = Counter(manifest["shard_index"] for manifest in manifests)
+    for index in range(count):
+        if indices[index] == 0:
+            errors.append(f"missing shard {index}/{count}")
+        elif indices[index] > 1:
+            errors.append(f"shard {index}/{count} has {indices[index]} manifests")
+    for index in indices:
+        if not 0 <= index < count:
+            errors.append(f"unexpected shard index {index} for {count} shards")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify and merge sharded curvature feature outputs.")
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="Merged output CSV (the --output the sharded runs were given)",
+    )
+    parser.add_argument(
+        "--manifests",
+        nargs="*",
+        default=None,
+        help="Explicit shard manifests (default: discover next to --output)",
+    )
+    parser.add_argument(
+        "--dataset-index",
+        default="",
+        help="Dataset index CSV (default: the one recorded in the manifests)",
+    )
+    parser.add_argument(
+        "--split",
+        default=None,
+        help="Split CSV (default: the one recorded in the manifests)",
+    )
+    parser.add_argument(
+        "--split-set",
+        default=None,
+        help="Split set (default: the one recorded in the manifests)",
+    )
+    parser.add_argument(
+        "--allow-incomplete",
+        action="store_true",
+        help="Write the merged output even if networks are missing",
+    )
+    args = parser.parse_args()
+
+    manifest_paths = args.manifests if args.manifests else discover_manifests(args.output)
+    if not manifest_paths:
+        print(f"no shard manifests found for {args.output}", file=sys.stderr)
+        sys.exit(1)
+    manifests = [read_manifest(path) for path in manifest_paths]
+    manifests.sort(key=lambda manifest: manifest["shard_index"])
+
+    errors = []
+    warnings = []
+    count = check_consistency(manifests, errors)
+
+    dataset_index = args.dataset_index or manifests[0]["dataset_index"]
+    split_path = manifests[0]["split"] if args.split is None else args.split
+    split_set = manifests[0]["split_set"] if args.split_set is None else args.split_set
+
+    if file_sha256(dataset_index) != manifests[0]["dataset_index_sha256"]:
+        warnings.append(f"{dataset_index} changed since the shards ran")
+    if file_sha256(split_path) != manifests[0]["split_sha256"]:
+        warnings.append(f"{split_path} changed since the shards ran")
+
+    split_filter = read_split_filter(split_path, split_set)
+    with open(dataset_index, newline="", encoding="utf-8") as f:
+        index_rows = list(csv.DictReader(f))
+
+    index_names = Counter(row.get("name", "") for row in index_rows)
+    for name, n in sorted(index_names.items()):
+        if n > 1 and (not split_filter or name in split_filter):
+            warnings.append(f"{name} appears {n} times in {dataset_index}")
+    for name in sorted(split_filter):
+        if name not in index_names:
+            warnings.append(f"{name} is in {split_path} but not in {dataset_index}")
+
+    candidates = select_candidates(index_rows, split_filter)
+    expected = assign_shards(candidates, count)
+    present = {manifest["shard_index"] for manifest in manifests}
+    orphaned = sorted(name for name, shard in expected.items() if shard not in present)
+    if orphaned:
+        preview = ", ".join(orphaned[:10]) + (", ..." if len(orphaned) > 10 else "")
+        errors.append(f"{len(orphaned)} network(s) belong to missing shards: {preview}")
+
+    fieldnames = None
+    rows_by_name = {}
+    seen_in = defaultdict(list)
+    for manifest in manifests:
+        shard = manifest["shard_index"]
+        assigned = set(manifest["assigned"])
+        planned = {name for name, target in expected.items() if target == shard}
+        for name in sorted(planned - assigned):
+            errors.append(f"{name} belongs to shard {shard} but was not assigned there")
+        for name in sorted(assigned - planned):
+            errors.append(f"{name} was assigned to shard {shard} but does not belong there")
+
+        if not os.path.exists(manifest["output"]):
+            errors.append(f"shard {shard} output missing: {manifest['output']}")
+            continue
+        with open(manifest["output"], newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if fieldnames is None:
+                fieldnames = reader.fieldnames
+            elif reader.fieldnames != fieldnames:
+                errors.append(f"shard {shard} columns differ from shard {manifests[0]['shard_index']}")
+            for row in reader:
+                name = row.get("name", "")
+                seen_in[name].append(shard)
+                if name not in assigned:
+                    errors.append(f"{name} written by shard {shard} but not assigned to it")
+                rows_by_name[name] = row
+
+        skipped = manifest.get("skipped", {})
+        written = {name for name, shards in seen_in.items() if shard in shards}
+        for name in sorted(assigned - written - set(skipped)):
+            errors.append(f"{name} (shard {shard}) has neither a row nor a skip reason")
+
+    for name, shards in sorted(seen_in.items()):
+        if len(shards) > 1:
+            errors.append(f"{name} written {len(shards)} times (shards {shards})")
+
+    skipped_counts = Counter(
+        reason for manifest in manifests for reason in manifest.get("skipped", {}).values()
+    )
+
+    for warning in warnings:
+        print("warning:", warning, file=sys.stderr)
+    for error in errors:
+        print("error:", error, file=sys.stderr)
+    if errors and not args.allow_incomplete:
+        print(f"not writing {args.output}: {len(errors)} error(s)", file=sys.stderr)
+        sys.exit(1)
+
+    # Canonical order is dataset index order, independent of shard layout.
+    merged = []
+    for row in index_rows:
+        name = row.get("name", "")
+        if name in rows_by_name:
+            merged.append(rows_by_name.pop(name))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames or ["name"])
+        writer.writeheader()
+        writer.writerows(merged)
+
+    print("merged", len(merged), "rows from", len(manifests), "shards into", args.output)
+    for key, val in sorted(skipped_counts.items()):
+        print(f"skipped_{key}", val)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import numpy as np
+
+
+# Approximate Ollivier-Ricci curvature for all edges at once. GCS ocurve and
+# lazocurve solve one small transport LP per edge: the mass of (x, N(x)) is
+# moved onto (y, N(y)) with costs equal to graph distance capped at 3, and
+# curvature is 1 - W1. Here those problems are padded into tensors bucketed by
+# support size and solved together with batched Sinkhorn iterations.
+#
+# Plain (kernel) scaling is used rather than log-domain updates: every support point is within distance 2 of
+# the other side, so exp(-C / reg) and the scalings stay representable for
+# reg >= MIN_REG. Larger reg converges faster; because the plan is rounded and
+# costs are small integers, it is often also closer to the exact value. With
+# DEFAULT_REG the error on seeded synthetic webs (20-300 nodes, connectance
+# 0.1-0.3, heterogeneity 0-1.5) is mostly below 1e-3, with a maximum of ~4e-3.
+#
+# Each solution gives a rigorous per-edge bracket for W1. The Sinkhorn plan is
+# rounded onto the exact marginals (Altschuler et al., 2017), so its cost is an
+# upper bound. Any c-transformed potentials are dual feasible, so their value
+# is a lower bound. Curvature is reported from the feasible plan, and the gap
+# bounds its error. The entropic potentials alone leave a gap of ~reg, far
+# above the actual error. Costs are integers, so the transport LP has an
+# integral optimal dual; rounding the potentials to integers (after a shift)
+# and c-transforming them usually recovers it, which closes the gap to the
+# plan's own error.
+#
+# Many edges of a bipartite web have curvature exactly 0, where the plan's
+# value lands a hair below it. Whenever the bracket contains 0 (or the value is
+# within ZERO_TOL of it) the edge is reported as 0, so sign features such as
+# neg_frac match the exact solver; the bound still covers the bracket.
+
+DEFAULT_REG = 0.05
+# Below this the scaling vectors (~exp(2 / reg)) overflow float64.
+MIN_REG = 0.005
+DEFAULT_TOL = 1e-6
+DEFAULT_MAX_ITER = 2000
+# Caps each (edges, rows, cols) bucket chunk at ~16 MB per float tensor.
+CHUNK_ELEMENTS = 1 << 21
+CHECK_EVERY = 10
+# Shifts tried when rounding the potentials: the rounding boundary is placed in
+# the middle of each of the widest gaps between their fractional parts.
+DUAL_SHIFTS = 4
+ZERO_TOL = 1e-9
+
+
+def _bucket_size(n):
+    # Pad support sizes to powers of two to keep the number of buckets small.
+    return 1 << (int(n) - 1).bit_length()
+
+
+def sinkhorn(a, b, K, tol, max_iter):
+    """
+    Batched Sinkhorn scaling for plans P = u_i K_ij v_j with marginals a, b.
+    Problems leave the batch once their row residual (L1) is below tol.
+    Returns (u, v, iterations).
+    """
+    u_out = np.zeros_like(a)
+    v_out = np.zeros_like(b)
+    iterations = np.full(len(a), max_iter)
+    live = np.arange(len(a))
+    u = np.ones_like(a)
+    v = np.ones_like(b)
+    for iteration in range(1, max_iter + 1):
+        Kv = np.einsum("knm,km->kn", K, v)
+        u = np.divide(a, Kv, out=np.zeros_like(a), where=Kv > 0)
+        Ku = np.einsum("knm,kn->km", K, u)
+        v = np.divide(b, Ku, out=np.zeros_like(b), where=Ku > 0)
+        if iteration % CHECK_EVERY and iteration != max_iter:
+            continue
+        # Columns are exact after the v update; rows carry the residual.
+        residual = np.sum(np.abs(u * np.einsum("knm,km->kn", K, v) - a), axis=1)
+        done = (residual < tol) | (iteration == max_iter)
+        u_out[live[done]] = u[done]
+        v_out[live[done]] = v[done]
+        iterations[live[done]] = iteration
+        if done.all():
+            break
+        keep = ~done
+        live, a, b, K, u, v = live[keep], a[keep], b[keep], K[keep], u[keep], v[keep]
+    return u_out, v_out, iterations
+
+
+def round_plan(P, a, b):
+    # Altschuler et al. (2017), Algorithm 2: scale rows and columns down to the
+    # target marginals, then add the rank-one correction for the missing mass.
+    rows = P.sum(axis=2)
+    P = P * np.minimum(1.0, np.divide(a, rows, out=np.zeros_like(a), where=rows > 0))[:, :, None]
+    cols = P.sum(axis=1)
+    P = P * np.minimum(1.0, np.divide(b, cols, out=np.zeros_like(b), where=cols > 0))[:, None, :]
+    err_a = a - P.sum(axis=2)
+    err_b = b - P.sum(axis=1)
+    norm = err_a.sum(axis=1)
+    scale = np.divide(1.0, norm, out=np.zeros_like(norm), where=norm > 0)
+    return P + err_a[:, :, None] * err_b[:, None, :] * scale[:, None, None]
+
+
+def dual_lower_bound(a, b, C, f):
+    # Two c-transforms make (f, g) feasible: f_i + g_j <= C_ij on the supports.
+    # Rows whose scaling underflowed (f = -inf) constrain nothing.
+    big = np.inf
+    row_live = a > 0
+    col_live = b > 0
+    g = np.min(np.where((row_live & np.isfinite(f))[:, :, None], C - f[:, :, None], big), axis=1)
+    g = np.where(col_live, g, 0.0)
+    f = np.min(np.where(col_live[:, None, :], C - g[:, None, :], big), axis=2)
+    f = np.where(row_live, f, 0.0)
+    return np.sum(a * f, axis=1) + np.sum(b * g, axis=1)
+
+
+def integer_dual_lower_bound(a, b, C, f, shifts=DUAL_SHIFTS):
+    # max(dual_lower_bound) over f and its integer roundings. A constant shift
+    # does not change the dual value, so round(f - s) is tried for the shifts s
+    # that put the rounding boundary far from every live f_i.
+    best = dual_lower_bound(a, b, C, f)
+    live = (a > 0) & np.isfinite(f)
+    frac = np.where(live, f - np.floor(np.where(live, f, 0.0)), np.inf)
+    # Dead rows repeat the smallest live fraction, so they add no gap.
+    smallest = np.min(frac, axis=1, keepdims=True)
+    frac = np.sort(np.where(live, frac, smallest), axis=1)
+    gaps = np.diff(np.concatenate((frac, frac[:, :1] + 1.0), axis=1), axis=1)
+    widest = np.argsort(-gaps, axis=1)[:, :shifts]
+    for column in widest.T:
+        start = np.take_along_axis(frac, column[:, None], axis=1)
+        width = np.take_along_axis(gaps, column[:, None], axis=1)
+        shift = start + width / 2 - 0.5
+        rounded = np.where(live, np.round(np.where(live, f, 0.0) - shift), -np.inf)
+        best = np.maximum(best, dual_lower_bound(a, b, C, rounded))
+    return best
+
+
+def _distances(A, A_2, rows, cols):
+    # GCS `dist`: 0, 1, 2 (common neighbour) or 3 for anything farther.
+    same = rows[:, :, None] == cols[:, None, :]
+    adjacent = A[rows[:, :, None], cols[:, None, :]] > 0
+    two_step = A_2[rows[:, :, None], cols[:, None, :]] > 0
+    return np.where(same, 0.0, np.where(adjacent, 1.0, np.where(two_step, 2.0, 3.0)))
+
+
+def _support(x, nbrs, size):
+    return np.pad(np.concatenate(([x], nbrs)), (0, size - len(nbrs) - 1), mode="edge")
+
+
+def _masses(neighbour_counts, size, idleness):
+    k = len(neighbour_counts)
+    mass = np.zeros((k, size))
+    mass[:, 0] = idleness
+    positions = np.arange(size)[None, :]
+    spread = ((1.0 - idleness) / neighbour_counts)[:, None]
+    mass += np.where((positions >= 1) & (positions <= neighbour_counts[:, None]), spread, 0.0)
+    return mass
+
+
+def ollivier_sinkhorn(A, edge_pairs, idleness=0.0, reg=DEFAULT_REG, tol=DEFAULT_TOL, max_iter=DEFAULT_MAX_ITER):
+    """
+    Approximate ocurve (idleness=0) or lazocurve(p=idleness) for every edge.
+    Returns (curvatures, error_bounds), both in edge_pairs order.
+    """
+    if reg < MIN_REG:
+        raise ValueError(f"Sinkhorn regularisation must be >= {MIN_REG}, got {reg}")
+    A = np.asarray(A, dtype=float)
+    A_2 = A @ A
+    np.fill_diagonal(A_2, 0)
+    neighbours = [np.flatnonzero(row) for row in A]
+    curvatures = np.zeros(len(edge_pairs))
+    bounds = np.zeros(len(edge_pairs))
+
+    buckets = {}
+    for e, (x, y) in enumerate(edge_pairs):
+        # W1 is symmetric, so orient each edge with the smaller support first.
+        if len(neighbours[x]) > len(neighbours[y]):
+            x, y = y, x
+        key = (_bucket_size(len(neighbours[x]) + 1), _bucket_size(len(neighbours[y]) + 1))
+        buckets.setdefault(key, []).append((e, x, y))
+
+    for (n_rows, n_cols), members in sorted(buckets.items()):
+        step = max(1, CHUNK_ELEMENTS // (n_rows * n_cols))
+        for start in range(0, len(members), step):
+            chunk = members[start:start + step]
+            edges = np.array([e for e, _, _ in chunk])
+            # Padding repeats the last support point and carries no mass.
+            rows = np.array([_support(x, neighbours[x], n_rows) for _, x, _ in chunk])
+            cols = np.array([_support(y, neighbours[y], n_cols) for _, _, y in chunk])
+            C = _distances(A, A_2, rows, cols)
+            a = _masses(np.array([len(neighbours[x]) for _, x, _ in chunk]), n_rows, idleness)
+            b = _masses(np.array([len(neighbours[y]) for _, _, y in chunk]), n_cols, idleness)
+            K = np.exp(-C / reg)
+            u, v, _ = sinkhorn(a, b, K, tol, max_iter)
+            P = round_plan(u[:, :, None] * K * v[:, None, :], a, b)
+            with np.errstate(divide="ignore"):
+                f = reg * np.log(u)
+            upper = np.sum(P * C, axis=(1, 2))
+            lower = integer_dual_lower_bound(a, b, C, f)
+            low = 1.0 - upper
+            high = 1.0 - lower
+            gap = upper - lower
+            bound = np.where(np.isfinite(gap), np.maximum(0.0, gap), np.inf)
+            with np.errstate(invalid="ignore"):
+                snap = (np.abs(low) <= ZERO_TOL) | (np.isfinite(high) & (low <= 0) & (high >= -ZERO_TOL))
+            # Adding 0.0 also turns any -0.0 into 0.0.
+            curvatures[edges] = np.where(snap, 0.0, low) + 0.0
+            bounds[edges] = np.where(snap, np.maximum(np.maximum(-low, high), 0.0), bound)
+    return curvatures.tolist(), bounds.tolist()
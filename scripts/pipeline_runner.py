@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+import argparse
+import concurrent.futures
+import csv
+import datetime
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+from sharding import file_sha256
+
+
+LOG_FIELDS = ["exp_id", "dataset", "method", "baseline", "metrics", "config_hash", "results_path", "notes"]
+
+
+def load_config(path):
+    try:
+        import yaml
+    except ImportError:
+        print("PyYAML is required. Install with: pip install pyyaml", file=sys.stderr)
+        sys.exit(1)
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def format_value(value, params):
+    return str(value).format(**params)
+
+
+def expand_inputs(paths):
+    # A glob such as scripts/*.py covers every sibling module a script imports,
+    # including ones added later; a pattern matching nothing stays as-is and
+    # fingerprints as missing.
+    expanded = []
+    for path in paths:
+        matches = sorted(glob.glob(path)) if glob.has_magic(path) else []
+        expanded.extend(matches or [path])
+    return expanded
+
+
+def resolve_stages(config, params):
+    stages = {}
+    for name, spec in config.get("stages", {}).items():
+        stages[name] = {
+            "cmd": [format_value(part, params) for part in spec["cmd"]],
+            "inputs": expand_inputs([format_value(path, params) for path in spec.get("inputs", [])]),
+            "outputs": [format_value(path, params) for path in spec.get("outputs", [])],
+            "after": list(spec.get("after", [])),
+        }
+
+    producers = {}
+    for name, stage in stages.items():
+        for path in stage["outputs"]:
+            producers[os.path.normpath(path)] = name
+    for name, stage in stages.items():
+        deps = set(stage["after"])
+        for path in stage["inputs"]:
+            producer = producers.get(os.path.normpath(path))
+            if producer and producer != name:
+                deps.add(producer)
+        unknown = deps - set(stages)
+        if unknown:
+            raise ValueError(f"stage {name} depends on unknown stage(s) {sorted(unknown)}")
+        stage["deps"] = sorted(deps)
+    return stages
+
+
+def path_fingerprint(path):
+    if os.path.isfile(path):
+        return f"file:{file_sha256(path)}"
+    if os.path.isdir(path):
+        # Hashing every edgelist on a network mount is slow; path, size and
+        # mtime are enough to notice added, removed or rewritten files.
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for filename in sorted(files):
+                full = os.path.join(root, filename)
+                st = os.stat(full)
+                digest.update(f"{os.path.relpath(full, path)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+        return f"dir:{digest.hexdigest()}"
+    return "missing"
+
+
+def stage_fingerprint(stage):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(stage["cmd"]).encode("utf-8"))
+    for path in sorted(stage["inputs"]):
+        digest.update(f"{path}\0{path_fingerprint(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def stamp_path(state_dir, name):
+    return os.path.join(state_dir, f"{name}.json")
+
+
+def is_current(state_dir, name, stage, fingerprint):
+    path = stamp_path(state_dir, name)
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding="utf-8") as f:
+        stamp = json.load(f)
+    if stamp.get("fingerprint") != fingerprint:
+        return False
+    # Outputs clobbered or edited since the stage ran also make it stale.
+    for output in stage["outputs"]:
+        if path_fingerprint(output) != stamp.get("outputs", {}).get(output):
+            return False
+    return True
+
+
+def write_stamp(state_dir, name, stage, fingerprint, elapsed):
+    stamp = {
+        "fingerprint": fingerprint,
+        "cmd": stage["cmd"],
+        "outputs": {output: path_fingerprint(output) for output in stage["outputs"]},
+        "elapsed_s": round(elapsed, 3),
+        "finished": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(stamp_path(state_dir, name), "w", encoding="utf-8") as f:
+        json.dump(stamp, f, indent=2)
+        f.write("\n")
+
+
+def run_stage(state_dir, name, stage):
+    os.makedirs(os.path.join(state_dir, "logs"), exist_ok=True)
+    for output in stage["outputs"]:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    log_path = os.path.join(state_dir, "logs", f"{name}.log")
+    start = time.monotonic()
+    with open(log_path, "w", encoding="utf-8") as log:
+        log.write("$ " + " ".join(stage["cmd"]) + "\n")
+        log.flush()
+        try:
+            returncode = subprocess.run(stage["cmd"], stdout=log, stderr=subprocess.STDOUT).returncode
+        except OSError as exc:
+            log.write(f"{exc}\n")
+            returncode = 127
+    return returncode, time.monotonic() - start, log_path
+
+
+def select_stages(stages, targets):
+    if not targets:
+        return set(stages)
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in stages:
+            raise ValueError(f"unknown stage {name}")
+        if name not in selected:
+            selected.add(name)
+            pending.extend(stages[name]["deps"])
+    return selected
+
+
+def append_experiment_log(path, row):
+    exists = os.path.exists(path) and os.path.getsize(path) > 0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=LOG_FIELDS)
+        if not exists:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run pipeline stages, skipping those whose outputs are current.")
+    parser.add_argument("--config", default="configs/pipeline.yaml", help="Pipeline config YAML")
+    parser.add_argument("--targets", default="", help="Comma-separated stages to run (plus their upstream stages)")
+    parser.add_argument("--force", default="", help="Comma-separated stages to re-run even if current")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Max stages run concurrently")
+    parser.add_argument("--exp-id", default="", help="Experiment ID (default: <exp_prefix>_<timestamp>)")
+    parser.add_argument("--set", action="append", default=[], help="Override a param, e.g. --set max_edges=2000")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages are stale")
+    parser.add_argument("--no-log", action="store_true", help="Do not append to the experiment log")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    params = {"python": sys.executable}
+    params.update(config.get("params", {}))
+    if os.environ.get("DATASET_ROOT"):
+        params["dataset_root"] = os.environ["DATASET_ROOT"]
+    for override in args.set:
+        key, sep, value = override.partition("=")
+        if not sep:
+            parser.error(f"--set expects key=value, got {override!r}")
+        params[key] = value
+    exp_id = args.exp_id or "{}_{}".format(
+        config.get("exp_prefix", "pipeline"), datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    )
+    params["exp_id"] = exp_id
+
+    stages = resolve_stages(config, params)
+    selected = select_stages(stages, [t for t in args.targets.split(",") if t])
+    forced = {f for f in args.force.split(",") if f}
+    state_dir = config.get("state_dir", "data/.pipeline")
+    os.makedirs(state_dir, exist_ok=True)
+
+    status = {}
+    elapsed = {}
+    running = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        while True:
+            progressed = False
+            for name in sorted(selected):
+                if name in status or name in running.values():
+                    continue
+                deps = [d for d in stages[name]["deps"] if d in selected]
+                if any(status.get(d) in {"failed", "blocked"} for d in deps):
+                    status[name] = "blocked"
+                    progressed = True
+                    print(f"[{name}] blocked by failed upstream stage")
+                    continue
+                if not all(status.get(d) in {"ran", "current"} for d in deps):
+                    continue
+                stage = stages[name]
+                fingerprint = stage_fingerprint(stage)
+                # Inputs are content-hashed, so a re-run upstream stage that wrote
+                # identical outputs leaves this one current. A dry run cannot know
+                # that yet and reports it stale.
+                would_change = args.dry_run and any(status.get(d) == "ran" for d in deps)
+                if name not in forced and not would_change and is_current(state_dir, name, stage, fingerprint):
+                    status[name] = "current"
+                    progressed = True
+                    print(f"[{name}] current, skipping")
+                    continue
+                if args.dry_run:
+                    status[name] = "ran"
+                    progressed = True
+                    print(f"[{name}] stale, would run: {' '.join(stage['cmd'])}")
+                    continue
+                print(f"[{name}] running: {' '.join(stage['cmd'])}")
+                future = pool.submit(run_stage, state_dir, name, stage)
+                running[future] = name
+                stage["fingerprint"] = fingerprint
+
+            if progressed:
+                continue
+            if not running:
+                break
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                returncode, seconds, log_path = future.result()
+                elapsed[name] = seconds
+                if returncode == 0:
+                    # Fingerprint taken before the run: inputs changed mid-run will
+                    # make the stage stale again next time, which is what we want.
+                    write_stamp(state_dir, name, stages[name], stages[name]["fingerprint"], seconds)
+                    status[name] = "ran"
+                    print(f"[{name}] done in {seconds:.1f}s")
+                else:
+                    status[name] = "failed"
+                    print(f"[{name}] failed with exit code {returncode}; see {log_path}", file=sys.stderr)
+
+    by_status = {}
+    for name in sorted(status):
+        by_status.setdefault(status[name], []).append(name)
+    for key in ("ran", "current", "failed", "blocked"):
+        if by_status.get(key):
+            print(f"{key}:", ",".join(by_status[key]))
+
+    # Runs where every stage was current are logged too, so the log records
+    # each time the outputs were confirmed up to date.
+    if not args.dry_run and not args.no_log:
+        config_hash = hashlib.sha256(
+            json.dumps({name: stage["cmd"] for name, stage in sorted(stages.items())}).encode("utf-8")
+        ).hexdigest()[:12]
+        sinks = [name for name in sorted(selected) if not any(name in stages[o]["deps"] for o in selected)]
+        notes = [f"config={args.config}"]
+        if by_status.get("ran"):
+            notes.append("ran=" + ",".join(f"{n}:{elapsed[n]:.1f}s" for n in by_status["ran"]))
+        for key in ("current", "failed", "blocked"):
+            if by_status.get(key):
+                notes.append(f"{key}=" + ",".join(by_status[key]))
+        append_experiment_log(
+            config.get("experiment_log", "logs/experiment_log.csv"),
+            {
+                "exp_id": exp_id,
+                "dataset": config.get("dataset", ""),
+                "method": config.get("method", "pipeline"),
+                "baseline": "",
+                "metrics": "",
+                "config_hash": config_hash,
+                "results_path": ";".join(o for name in sinks for o in stages[name]["outputs"]),
+                "notes": "; ".join(notes),
+            },
+        )
+        print("experiment log row appended for", exp_id)
+
+    if by_status.get("failed") or by_status.get("blocked"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
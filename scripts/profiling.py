@@ -0,0 +1,105 @@
+import glob
+import os
+import re
+
+from sharding import execution_option
+
+
+# Opt-in cProfile hook around the per-network measure computations. With
+# --profile DIR, each selected (network, measure) call writes
+# DIR/<network>.<measure>.prof (pstats format; open with snakeviz or
+# `python -m pstats`), and the run ends with a hot-function table aggregated
+# over every profile it wrote. When disabled, measure calls go straight to the
+# function.
+
+DEFAULT_TOP = 25
+
+
+def add_profile_arguments(parser):
+    execution_option(
+        parser,
+        "--profile",
+        default="",
+        help="Write a cProfile .prof per network and measure into this directory plus a hot-function summary",
+    )
+    execution_option(
+        parser,
+        "--profile-names",
+        type=lambda value: sorted({v for v in value.split(",") if v}),
+        default=[],
+        help="Comma-separated network names to profile (default: all networks)",
+    )
+
+
+def profile_settings(args):
+    # Passed to workers inside the per-network settings; None disables profiling.
+    if not args.profile:
+        return None
+    return {"dir": args.profile, "names": frozenset(args.profile_names)}
+
+
+def _safe(text):
+    return re.sub(r"[^A-Za-z0-9_.,=-]+", "_", text)
+
+
+def measure_label(key):
+    # ("orc_idl", 0.25) -> "orc_idl-0.25"; (name, value) pairs become
+    # name=value, other tuples are comma-joined and None is dropped.
+    parts = []
+    for part in key:
+        if part is None:
+            continue
+        if isinstance(part, tuple) and len(part) == 2 and isinstance(part[0], str):
+            part = f"{part[0]}={part[1]}"
+        elif isinstance(part, tuple):
+            part = ",".join(str(p) for p in part)
+        parts.append(str(part))
+    return "-".join(parts)
+
+
+def profiling(profile, name):
+    return profile is not None and (not profile["names"] or name in profile["names"])
+
+
+def profiled_call(profile, name, measure, fn, *args):
+    if not profiling(profile, name):
+        return fn(*args)
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args)
+    finally:
+        os.makedirs(profile["dir"], exist_ok=True)
+        profiler.dump_stats(os.path.join(profile["dir"], f"{_safe(name)}.{_safe(measure)}.prof"))
+
+
+def summarize_profiles(directory, since, top=DEFAULT_TOP):
+    """
+    Aggregate the profiles written since `since` (a time.time() value) into
+    DIR/hot_functions.txt and return the top lines for printing.
+    """
+    import io
+    import pstats
+
+    # One second of slack for filesystems with coarse modification times.
+    paths = sorted(
+        path for path in glob.glob(os.path.join(directory, "*.prof")) if os.path.getmtime(path) >= since - 1
+    )
+    if not paths:
+        return [f"profile: no profiles written to {directory}"]
+    stats = pstats.Stats(*paths)
+    stats.sort_stats("tottime")
+    summary_path = os.path.join(directory, "hot_functions.txt")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        stats.stream = f
+        f.write(f"{len(paths)} profiles\n")
+        stats.print_stats()
+    buffer = io.StringIO()
+    stats.stream = buffer
+    stats.print_stats(top)
+    table = buffer.getvalue().splitlines()
+    # Skip the per-file header pstats prints before the column header.
+    start = next((i for i, line in enumerate(table) if line.lstrip().startswith("ncalls")), 0)
+    lines = [f"profile: {len(paths)} profiles in {directory}, aggregated in {summary_path}"]
+    return lines + [line for line in table[start:] if line.strip()]
@@ -0,0 +1,428 @@
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+
+from sharding import execution_option, network_size
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+
+# Rough peak bytes of each measure for a network with n nodes, m edges and
+# (row, col) degree bounds d. Terms follow the allocations in the vendored GCS
+# code: the dense adjacency list, the q^3 `sum4` tensor built as nested Python
+# floats in the Bakry-Emery functions, the n x n `W`/`pinv` in
+# effectiveResistance and the per-edge dense LP in ocurve. The self-correcting
+# factors in MemoryModel absorb the constants.
+def _lp_entries(d):
+    d_row, d_col = d
+    return (d_row + 1) * (d_col + 1) * (d_row + d_col + 2)
+
+
+MEASURE_MEMORY = {
+    "orc": lambda n, m, d: 8 * n * n + 48 * _lp_entries(d),
+    "orc_idl": lambda n, m, d: 8 * n * n + 48 * _lp_entries(d),
+    "lly": lambda n, m, d: 8 * n * n + 48 * _lp_entries(d),
+    "nnlly": lambda n, m, d: 8 * n * n + 48 * _lp_entries(d),
+    # ollivier_sinkhorn.py: dense A and A^2 plus bucket chunks capped at 2^21 entries.
+    "orc_sk": lambda n, m, d: 16 * n * n + 64 * min(m * (d[0] + 1) * (d[1] + 1), 1 << 21),
+    "orc_idl_sk": lambda n, m, d: 16 * n * n + 64 * min(m * (d[0] + 1) * (d[1] + 1), 1 << 21),
+    "be_non_norm": lambda n, m, d: 48 * n ** 3 + 64 * n * n,
+    "be_norm": lambda n, m, d: 48 * n ** 3 + 64 * n * n,
+    "be_non_norm_dim": lambda n, m, d: 48 * n ** 3 + 64 * n * n,
+    "be_norm_dim": lambda n, m, d: 48 * n ** 3 + 64 * n * n,
+    # bakry_emery.py sign mode: a few dense n x n arrays plus bounded chunks.
+    "be_sign": lambda n, m, d: 64 * n * n,
+    "steiner": lambda n, m, d: 96 * n * n,
+    "node_res": lambda n, m, d: 120 * n * n,
+    "link_res": lambda n, m, d: 160 * n * n,
+    "grc_orc": lambda n, m, d: 200 * n * n + 1000 * m,
+    "grc_frc": lambda n, m, d: 1000 * m,
+    "baseline": lambda n, m, d: 16 * n * n if n <= 200 else 400 * m,
+}
+
+# Measures whose large-network cost is dense linear algebra (A @ A, the sum4
+# matmul, eigvalsh, pinv); only these benefit from extra BLAS threads.
+BLAS_MEASURES = {
+    "be_non_norm",
+    "be_norm",
+    "be_non_norm_dim",
+    "be_norm_dim",
+    "be_sign",
+    "steiner",
+    "node_res",
+    "link_res",
+}
+BLAS_STRATEGIES = ("hybrid", "threads", "processes")
+
+# Every job pays for its intermediate Python objects regardless of size.
+JOB_OVERHEAD_BYTES = 32 << 20
+# Small jobs are dominated by allocator noise, so they do not calibrate.
+MIN_CALIBRATION_BYTES = 64 << 20
+MIN_FACTOR = 0.05
+DEFAULT_MEMORY_MODEL = "data/.memory_model.json"
+
+
+def parse_size(value):
+    text = str(value).strip().upper().rstrip("B")
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    try:
+        if text and text[-1] in units:
+            return int(float(text[:-1]) * units[text[-1]])
+        return int(float(text or 0))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a size like 8G or 512M, got {value!r}")
+
+
+def format_size(n):
+    for unit in ("B", "K", "M", "G"):
+        if abs(n) < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}T"
+
+
+def measure_estimates(measures, nodes, edges, degrees):
+    return {m: MEASURE_MEMORY[m](nodes, edges, degrees) for m in measures if m in MEASURE_MEMORY}
+
+
+def blas_threads(strategy, cores, min_nodes, row, measures):
+    # 0 leaves the BLAS thread count alone.
+    if not strategy:
+        return 0
+    if strategy == "threads":
+        return cores
+    if strategy == "processes":
+        return 1
+    nodes = network_size(row)[0]
+    return cores if nodes >= min_nodes and BLAS_MEASURES.intersection(measures) else 1
+
+
+def row_estimates(row, measures, max_edges=0):
+    nodes, edges, degrees = network_size(row)
+    if max_edges and edges > max_edges:
+        # Skipped as too large right after loading, so only the load is paid.
+        return {}
+    return measure_estimates(measures, nodes, edges, degrees)
+
+
+class MemoryModel:
+    def __init__(self, path=""):
+        self.path = path
+        self.factors = {}
+        self.samples = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self.factors = saved.get("factors", {})
+            self.samples = saved.get("samples", {})
+
+    def estimate(self, raw):
+        if not raw:
+            return JOB_OVERHEAD_BYTES, ""
+        scaled = {m: b * self.factors.get(m, 1.0) for m, b in raw.items()}
+        # Measures run one after another, so the job peak is the largest one.
+        dominant = max(scaled, key=scaled.get)
+        return int(scaled[dominant]) + JOB_OVERHEAD_BYTES, dominant
+
+    def observe(self, measure, raw_bytes, measured_bytes):
+        if not measure or measured_bytes is None or raw_bytes < MIN_CALIBRATION_BYTES:
+            return
+        ratio = max(0, measured_bytes - JOB_OVERHEAD_BYTES) / raw_bytes
+        old = self.factors.get(measure, 1.0)
+        # Raise at once, decay slowly: an underestimate gets the box OOM-killed,
+        # an overestimate only costs some parallelism.
+        new = ratio if ratio > old else 0.8 * old + 0.2 * ratio
+        self.factors[measure] = round(max(MIN_FACTOR, new), 4)
+        self.samples[measure] = self.samples.get(measure, 0) + 1
+        self.dirty = True
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"factors": self.factors, "samples": self.samples}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+def memory_model(args):
+    # Calibration is only persisted when asked for: sharded nodes on a shared
+    # filesystem would otherwise overwrite each other's samples.
+    path = args.memory_model
+    if path is None:
+        path = DEFAULT_MEMORY_MODEL if args.memory_limit else ""
+    return MemoryModel(path)
+
+
+class Task:
+    def __init__(self, index, payload, label, raw_estimates, model, threads=0):
+        self.index = index
+        self.payload = payload
+        self.label = label
+        self.raw_estimates = raw_estimates
+        self.estimate, self.dominant = model.estimate(raw_estimates)
+        self.threads = threads
+        self.skips = 0
+
+    @property
+    def lane(self):
+        if not self.threads:
+            return "default"
+        return "blas" if self.threads > 1 else "single"
+
+
+def _status_bytes(field):
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    # Linux >= 4.0: writing 5 resets VmHWM to the current RSS.
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _maxrss_bytes(children=False):
+    try:
+        import resource
+    except ImportError:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    maxrss = resource.getrusage(who).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _child_growth(children_before, base):
+    # GRC's ORC runs in a pool of forked children. The kernel only keeps the
+    # largest peak of any waited-for child, so a child's growth shows up only
+    # when it beats every earlier child of this worker (a lower bound). A
+    # forked child starts with the parent's resident pages, so its own
+    # allocation is its peak minus the parent's RSS at the start.
+    after = _maxrss_bytes(children=True)
+    if children_before is None or after is None or after <= children_before or base is None:
+        return 0
+    return max(0, after - base)
+
+
+def _measured(fn, payload):
+    before = _status_bytes("VmRSS")
+    children = _maxrss_bytes(children=True)
+    if before is not None and _reset_peak_rss():
+        result = fn(payload)
+        peak = _status_bytes("VmHWM")
+        if peak is None:
+            return result, None
+        return result, max(0, peak - before) + _child_growth(children, before)
+    # Without a resettable high-water mark (macOS), only growth of the
+    # lifetime peak is observable, which is a lower bound.
+    before = _maxrss_bytes()
+    result = fn(payload)
+    after = _maxrss_bytes()
+    measured = after - before if before is not None and after is not None and after > before else None
+    growth = _child_growth(children, before)
+    if growth:
+        measured = (measured or 0) + growth
+    return result, measured
+
+
+def measured_call(fn, payload, threads=0):
+    limits = threadpool_limits(limits=threads) if threads and threadpool_limits else contextlib.nullcontext()
+    start = time.perf_counter()
+    with limits:
+        result, measured = _measured(fn, payload)
+    return result, measured, time.perf_counter() - start
+
+
+def _pick(pending, fits, running, max_skips):
+    head = pending[0]
+    if not running or fits(head):
+        return pending.popleft()
+    if head.skips >= max_skips:
+        # Stop packing around the head job so it is not starved.
+        return None
+    for i, task in enumerate(pending):
+        if fits(task):
+            head.skips += 1
+            del pending[i]
+            return task
+    return None
+
+
+def scheduled_map(fn, tasks, workers=1, memory_limit=0, model=None, observations=None, cores=0):
+    model = model or MemoryModel()
+    if workers <= 1:
+        for task in tasks:
+            task.estimate, task.dominant = model.estimate(task.raw_estimates)
+            result, measured, seconds = measured_call(fn, task.payload, task.threads)
+            model.observe(task.dominant, task.raw_estimates.get(task.dominant, 0), measured)
+            if observations is not None:
+                observations.append((task, measured, seconds))
+            yield task, result
+        return
+
+    pending = collections.deque(tasks)
+    running = {}
+    in_use = 0
+    threads_in_use = 0
+    ready = {}
+    next_index = min((task.index for task in pending), default=0)
+
+    # Memory and BLAS threads are both admitted against a budget. Estimates
+    # come from the live model, so factors raised by peaks measured earlier in
+    # this run already apply to the networks still pending.
+    def fits(task):
+        if memory_limit and in_use + model.estimate(task.raw_estimates)[0] > memory_limit:
+            return False
+        return not cores or threads_in_use + max(1, task.threads) <= cores
+
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                task = _pick(pending, fits, running, max_skips=4 * workers)
+                if task is None:
+                    break
+                task.estimate, task.dominant = model.estimate(task.raw_estimates)
+                if memory_limit and task.estimate > memory_limit:
+                    print(
+                        f"warning: {task.label} estimated at {format_size(task.estimate)} exceeds the memory limit; "
+                        "running it alone",
+                        file=sys.stderr,
+                    )
+                running[pool.submit(measured_call, fn, task.payload, task.threads)] = task
+                in_use += task.estimate
+                threads_in_use += max(1, task.threads)
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                in_use -= task.estimate
+                threads_in_use -= max(1, task.threads)
+                result, measured, seconds = future.result()
+                model.observe(task.dominant, task.raw_estimates.get(task.dominant, 0), measured)
+                if observations is not None:
+                    observations.append((task, measured, seconds))
+                ready[task.index] = (task, result)
+            # Hand results back in task order so outputs stay canonical.
+            while next_index in ready:
+                yield ready.pop(next_index)
+                next_index += 1
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def add_scheduler_arguments(parser):
+    execution_option(parser, "--workers", type=int, default=1, help="Networks computed in parallel processes")
+    execution_option(
+        parser,
+        "--blas-strategy",
+        choices=BLAS_STRATEGIES,
+        default="",
+        help=(
+            "Per-network BLAS threads: processes=1 each, threads=--cores each (one network at a time), "
+            "hybrid=--cores for large BLAS-bound networks and 1 for the rest (default: leave BLAS alone)"
+        ),
+    )
+    execution_option(
+        parser,
+        "--cores",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Core budget shared by BLAS threads of concurrently running networks",
+    )
+    execution_option(
+        parser,
+        "--blas-min-nodes",
+        type=int,
+        default=400,
+        help="Node count from which hybrid gives a network all --cores BLAS threads",
+    )
+    execution_option(
+        parser,
+        "--memory-limit",
+        type=parse_size,
+        default=0,
+        help="Admit networks only while their estimated peak memory fits, e.g. 8G (0=disable)",
+    )
+    execution_option(
+        parser,
+        "--memory-model",
+        default=None,
+        help=(
+            "Calibration JSON updated from measured peak RSS "
+            f"(default: {DEFAULT_MEMORY_MODEL} with --memory-limit, otherwise none)"
+        ),
+    )
+    execution_option(
+        parser,
+        "--memory-log",
+        default="",
+        help="Optional CSV of estimated vs measured peak memory per network",
+    )
+
+
+def check_blas_control(args):
+    if args.blas_strategy and threadpool_limits is None:
+        print(
+            "warning: threadpoolctl is not installed; BLAS thread counts are left unchanged. "
+            "Install with: pip install threadpoolctl",
+            file=sys.stderr,
+        )
+
+
+def throughput_report(observations, wall_seconds, strategy):
+    lines = [
+        f"strategy {strategy or 'default'}: {len(observations)} networks in {wall_seconds:.1f}s "
+        f"({len(observations) / wall_seconds if wall_seconds else 0:.2f}/s)"
+    ]
+    lanes = {}
+    for task, _, seconds in observations:
+        lane = lanes.setdefault(task.lane, [0, 0.0, task.threads])
+        lane[0] += 1
+        lane[1] += seconds
+    for name, (count, busy, threads) in sorted(lanes.items()):
+        lines.append(
+            f"  lane {name} ({threads or 'default'} BLAS threads): {count} networks, "
+            f"{busy:.1f}s busy, {count / busy if busy else 0:.2f}/s per worker"
+        )
+    return lines
+
+
+def write_memory_log(path, observations):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "dominant_measure", "threads", "estimated_bytes", "measured_bytes", "seconds"])
+        for task, measured, seconds in sorted(observations, key=lambda item: item[0].index):
+            writer.writerow(
+                [
+                    task.label,
+                    task.dominant,
+                    task.threads,
+                    task.estimate,
+                    "" if measured is None else measured,
+                    round(seconds, 4),
+                ]
+            )
@@ -0,0 +1,155 @@
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+
+
+MANIFEST_VERSION = 1
+# Namespace attribute naming the options that change how a shard runs but not
+# what it computes; shards may differ in these and still merge. Whoever adds
+# such an option registers it with execution_option.
+EXECUTION_KEY = "execution_parameters"
+# Inputs recorded by checksum at the top level of the manifest. Their paths may
+# differ between nodes, so they are not compared as parameters.
+INPUT_PATHS = {"dataset_index", "split"}
+
+
+def execution_option(parser, *flags, **kwargs):
+    action = parser.add_argument(*flags, **kwargs)
+    registered = parser.get_default(EXECUTION_KEY) or ()
+    parser.set_defaults(**{EXECUTION_KEY: tuple(sorted({*registered, action.dest}))})
+    return action
+
+
+def execution_parameters(args):
+    return set(getattr(args, EXECUTION_KEY, ())) | {EXECUTION_KEY}
+
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must satisfy 0 <= i < N, got {value!r}")
+    return index, count
+
+
+def int_or_zero(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def network_size(row):
+    # Metadata is available before the edgelist is read; without it, assume
+    # roughly one edge per 16 bytes of edgelist text. Max degrees are not
+    # recorded, so assume hubs reach four times the mean degree.
+    n_rows = int_or_zero(row.get("nrows"))
+    n_cols = int_or_zero(row.get("ncols"))
+    edges = int_or_zero(row.get("nlinks"))
+    if not (n_rows and n_cols and edges):
+        path = row.get("file_path", "")
+        edges = os.path.getsize(path) // 16 if path and os.path.exists(path) else 0
+        n_rows = n_cols = max(1, int(math.sqrt(edges * 2)))
+    d_row = min(n_cols, math.ceil(4 * edges / max(1, n_rows)))
+    d_col = min(n_rows, math.ceil(4 * edges / max(1, n_cols)))
+    return n_rows + n_cols, edges, (d_row, d_col)
+
+
+def estimate_cost(row):
+    # The dense GCS kernels are cubic in the node count and the per-edge
+    # transport problems scale with edges * nodes, so both terms are kept.
+    nodes, edges, _ = network_size(row)
+    return nodes ** 3 + edges * nodes
+
+
+def assign_shards(rows, count):
+    costs = {}
+    for row in rows:
+        name = row.get("name", "")
+        costs[name] = costs.get(name, 0) + estimate_cost(row)
+
+    # Longest-processing-time greedy: heaviest first onto the lightest shard.
+    # Ties break on name and shard index so every node computes the same plan.
+    loads = [(0, shard) for shard in range(count)]
+    assignment = {}
+    for name in sorted(costs, key=lambda n: (-costs[n], n)):
+        load, shard = heapq.heappop(loads)
+        assignment[name] = shard
+        heapq.heappush(loads, (load + costs[name], shard))
+    return assignment
+
+
+def shard_output_path(output, shard):
+    index, count = shard
+    base, ext = os.path.splitext(output)
+    return f"{base}.shard-{index}-of-{count}{ext}"
+
+
+def manifest_path(output):
+    return f"{output}.manifest.json"
+
+
+def file_sha256(path):
+    if not path or not os.path.exists(path):
+        return ""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def select_candidates(index_rows, split_filter):
+    return [row for row in index_rows if not split_filter or row.get("name", "") in split_filter]
+
+
+def record_limit_skips(assigned, processed, skipped):
+    # --limit stops a shard early; give the networks it never reached a skip
+    # reason so the merge can account for them. Returns how many were added.
+    remaining = sorted(set(assigned) - set(processed) - set(skipped))
+    for name in remaining:
+        skipped[name] = "limit"
+    return len(remaining)
+
+
+def build_manifest(args, shard, output, assigned, processed, skipped):
+    excluded = execution_parameters(args) | INPUT_PATHS
+    parameters = {key: value for key, value in sorted(vars(args).items()) if key not in excluded}
+    return {
+        "version": MANIFEST_VERSION,
+        "shard_index": shard[0],
+        "shard_count": shard[1],
+        "output": output,
+        "dataset_index": args.dataset_index,
+        "dataset_index_sha256": file_sha256(args.dataset_index),
+        "split": args.split,
+        "split_set": args.split_set,
+        "split_sha256": file_sha256(args.split),
+        "parameters": parameters,
+        "assigned": sorted(assigned),
+        "processed": sorted(processed),
+        "skipped": dict(sorted(skipped.items())),
+    }
+
+
+def write_manifest(output, manifest):
+    path = manifest_path(output)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_manifest(path):
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"{path}: unsupported manifest version {manifest.get('version')!r}")
+    return manifest
@@ -0,0 +1,223 @@
+import argparse
+import queue
+import threading
+import time
+
+from sharding import execution_option
+
+
+# Staged extraction loop: a loader thread reads and parses the next networks
+# into a bounded queue while the current one is computed, and a writer thread
+# drains finished rows, so edgelist I/O (slow on network mounts) and output
+# writes overlap with curvature. Counters per stage show which one bounds the
+# run: a load queue that is usually empty means compute waits on I/O, a full
+# one means compute is the bottleneck.
+
+_DONE = object()
+
+
+class StageCounters:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+
+
+class QueueCounters:
+    def __init__(self, name, capacity):
+        self.name = name
+        self.capacity = capacity
+        self.samples = 0
+        self.total_depth = 0
+        self.max_depth = 0
+        self.empty = 0
+
+    def sample(self, depth):
+        self.samples += 1
+        self.total_depth += depth
+        self.max_depth = max(self.max_depth, depth)
+        self.empty += depth == 0
+
+
+class PipelineStats:
+    def __init__(self, depth):
+        self.depth = depth
+        self.stages = {name: StageCounters(name) for name in ("load", "compute", "write")}
+        self.queues = {name: QueueCounters(name, depth) for name in ("load", "write")}
+
+    def observe_compute(self, observations):
+        stage = self.stages["compute"]
+        stage.items = len(observations)
+        stage.busy = sum(seconds for _, _, seconds in observations)
+
+    def report(self, wall_seconds):
+        lines = [f"pipeline (prefetch {self.depth}): {wall_seconds:.1f}s wall"]
+        for stage in self.stages.values():
+            if not stage.items:
+                continue
+            rate = stage.items / stage.busy if stage.busy else 0
+            lines.append(
+                f"  stage {stage.name}: {stage.items} items, {stage.busy:.2f}s busy ({rate:.2f}/s), "
+                f"{stage.blocked:.2f}s blocked"
+            )
+        for counters in self.queues.values():
+            if not counters.samples:
+                continue
+            mean = counters.total_depth / counters.samples
+            lines.append(
+                f"  queue {counters.name}: mean depth {mean:.2f}/{counters.capacity}, "
+                f"max {counters.max_depth}, empty {counters.empty}/{counters.samples}"
+            )
+        return lines
+
+
+def prefetch(tasks, load, depth, stats):
+    """
+    Yield tasks in order with load(task.payload) appended to each payload,
+    loaded by a background thread at most `depth` tasks ahead. The loaded
+    element is removed again once the consumer moves on to the next task.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    load_stage = stats.stages["load"]
+
+    def put(item):
+        # Bounded put that gives up once the consumer has gone away.
+        start = time.perf_counter()
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        load_stage.blocked += time.perf_counter() - start
+
+    def run():
+        try:
+            for task in tasks:
+                if stop.is_set():
+                    return
+                start = time.perf_counter()
+                loaded = load(task.payload)
+                load_stage.busy += time.perf_counter() - start
+                load_stage.items += 1
+                put((task, loaded))
+        except BaseException as exc:
+            put(exc)
+            return
+        put(_DONE)
+
+    loader = threading.Thread(target=run, name="prefetch-loader", daemon=True)
+    loader.start()
+    compute_stage = stats.stages["compute"]
+    try:
+        while True:
+            stats.queues["load"].sample(items.qsize())
+            start = time.perf_counter()
+            item = items.get()
+            compute_stage.blocked += time.perf_counter() - start
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            task, loaded = item
+            original = task.payload
+            task.payload = tuple(original) + (loaded,)
+            del item, loaded
+            try:
+                yield task
+            finally:
+                # The consumer has computed the task by the time it asks for
+                # the next one. Tasks outlive the run in observations, so drop
+                # the parsed network; otherwise every loaded graph stays alive
+                # and memory is no longer bounded by `depth`.
+                task.payload = original
+    finally:
+        stop.set()
+        loader.join()
+
+
+class WriteStage:
+    """
+    Run output calls on a writer thread behind a bounded queue. With depth 0
+    calls run inline, so the counters are still kept.
+    """
+
+    def __init__(self, depth, stats):
+        self.depth = depth
+        self.stats = stats
+        self.items = queue.Queue(maxsize=max(depth, 1))
+        self.thread = None
+        self.error = None
+
+    def __enter__(self):
+        if self.depth:
+            self.thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.thread:
+            self.items.put(_DONE)
+            self.thread.join()
+        if self.error and exc_info[0] is None:
+            raise self.error
+        return False
+
+    def _call(self, fn, args):
+        stage = self.stats.stages["write"]
+        start = time.perf_counter()
+        fn(*args)
+        stage.busy += time.perf_counter() - start
+        stage.items += 1
+
+    def _run(self):
+        while True:
+            item = self.items.get()
+            if item is _DONE:
+                return
+            if self.error is None:
+                try:
+                    self._call(*item)
+                except BaseException as exc:
+                    self.error = exc
+
+    def put(self, fn, *args):
+        if not self.thread:
+            self._call(fn, args)
+            return
+        if self.error:
+            raise self.error
+        self.stats.queues["write"].sample(self.items.qsize())
+        start = time.perf_counter()
+        self.items.put((fn, args))
+        self.stats.stages["compute"].blocked += time.perf_counter() - start
+
+
+def _depth(value):
+    depth = int(value)
+    if depth < 0:
+        raise argparse.ArgumentTypeError(f"expected a depth >= 0, got {value!r}")
+    return depth
+
+
+def add_prefetch_argument(parser):
+    execution_option(
+        parser,
+        "--prefetch",
+        type=_depth,
+        default=0,
+        help=(
+            "Load up to N networks ahead on a background thread and write rows on another, "
+            "printing per-stage counters (0=disable; loading stays in the workers with --workers > 1)"
+        ),
+    )
+
+
+def staged_tasks(tasks, load, args, stats):
+    # With worker processes each worker loads its own network, which already
+    # overlaps with the others' compute and avoids pickling parsed graphs.
+    if args.prefetch and args.workers <= 1:
+        return prefetch(tasks, load, args.prefetch, stats)
+    return tasks
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The scripts are standalone modules that import their siblings directly.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
@@ -0,0 +1,72 @@
+import argparse
+
+import pytest
+
+from bakry_emery import parse_thresholds, sign_features, threshold_counts, threshold_fields, threshold_fractions
+from compute_curvature_features_gcs import load_gcs_modules
+
+curvature, _ = load_gcs_modules()
+
+
+def threshold_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bakry-thresholds", type=parse_thresholds, default=[])
+    return parser
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--bakry-thresholds", "m0.5,0,0.5"],
+        ["--bakry-thresholds=-0.5,0,0.5"],
+        ["--bakry-thresholds", "M0.5, 0, 0.5,"],
+    ],
+)
+def test_negative_thresholds_parse(argv):
+    args = threshold_parser().parse_args(argv)
+    assert args.bakry_thresholds == [-0.5, 0.0, 0.5]
+    assert threshold_fields("be", args.bakry_thresholds) == ["be_ge_m0p5_frac", "be_ge_0_frac", "be_ge_0p5_frac"]
+
+
+def test_invalid_threshold_is_rejected():
+    with pytest.raises(SystemExit):
+        threshold_parser().parse_args(["--bakry-thresholds", "m0.5,x"])
+
+
+def adjacency(n, edges):
+    A = [[0] * n for _ in range(n)]
+    for i, j in edges:
+        A[i][j] = A[j][i] = 1
+    return A
+
+
+GRAPHS = {
+    # Irregular: a bipartite 3 x 4 web with a pendant and a non-bipartite
+    # graph with a triangle, a 4-cycle and a pendant vertex.
+    "bipartite_web": adjacency(7, [(0, 3), (0, 4), (0, 5), (1, 4), (1, 5), (1, 6), (2, 5)]),
+    "irregular": adjacency(6, [(0, 1), (1, 2), (0, 2), (2, 3), (3, 4), (4, 1), (4, 5)]),
+    "k33": adjacency(6, [(i, j) for i in range(3) for j in range(3, 6)]),
+}
+THRESHOLDS = [-1.0, -0.5, 0.0, 0.25, 0.5, 1.0]
+
+
+@pytest.mark.parametrize("name", sorted(GRAPHS))
+@pytest.mark.parametrize("dimension", [float("inf"), 3.0])
+@pytest.mark.parametrize("normalised", [False, True])
+def test_sign_mode_matches_vendored_curvature(name, dimension, normalised):
+    A = GRAPHS[name]
+    if normalised:
+        values = curvature.normalised_unweighted_curvature(A, dimension)
+    else:
+        values = curvature.non_normalised_unweighted_curvature(A, dimension)
+
+    n, counts = threshold_counts(A, dimension, normalised, THRESHOLDS)
+    assert n == len(values)
+    assert counts == {k: sum(1 for v in values if v >= k) for k in THRESHOLDS}
+
+    features = sign_features(A, "be", dimension, normalised, THRESHOLDS)
+    assert features["be_count"] == n
+    assert features["be_pos_frac"] == round(sum(1 for v in values if v > 0) / n, 6)
+    assert features["be_zero_frac"] == round(sum(1 for v in values if v == 0) / n, 6)
+    assert features["be_neg_frac"] == round(sum(1 for v in values if v < 0) / n, 6)
+    assert {k: v for k, v in features.items() if "_ge_" in k} == threshold_fractions(values, "be", THRESHOLDS)
@@ -0,0 +1,30 @@
+import argparse
+
+from batch_jobs import plan_pass
+
+
+def entries(count, selected=(0, 1)):
+    return [({"name": f"net{i}"}, list(selected)) for i in range(count)]
+
+
+def names(planned, job):
+    return [row["name"] for row, selected in planned if job in selected]
+
+
+def test_limited_jobs_are_planned_only_up_to_their_limit():
+    jobs = [argparse.Namespace(limit=2), argparse.Namespace(limit=0)]
+    position = [0, 0]
+    planned = plan_pass(entries(5), jobs, position, [0, 0])
+    assert names(planned, 0) == ["net0", "net1"]
+    assert names(planned, 1) == ["net0", "net1", "net2", "net3", "net4"]
+    assert position == [2, 5]
+    assert plan_pass(entries(5), jobs, position, [2, 5]) == []
+
+
+def test_short_job_resumes_after_its_last_network():
+    jobs = [argparse.Namespace(limit=3)]
+    position = [0]
+    assert names(plan_pass(entries(6, (0,)), jobs, position, [0]), 0) == ["net0", "net1", "net2"]
+    # net1 was skipped while computing: one more network, after net2.
+    assert names(plan_pass(entries(6, (0,)), jobs, position, [2]), 0) == ["net3"]
+    assert position == [4]
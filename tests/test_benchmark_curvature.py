@@ -0,0 +1,31 @@
+import json
+
+from benchmark_curvature import compare_baseline, generate_bipartite
+
+
+def test_generate_bipartite_is_seeded_and_connected():
+    nodes, edges = generate_bipartite(10, 0.2, 1.0, seed=3)
+    assert (nodes, edges) == generate_bipartite(10, 0.2, 1.0, seed=3)
+    assert len(nodes) == 10
+    assert all(u.startswith("r") and v.startswith("c") for u, v in edges)
+    assert {n for edge in edges for n in edge} == nodes
+    assert len(set(edges)) == len(edges)
+
+
+def test_compare_baseline_flags_slowdowns_and_memory_growth(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    previous = [
+        {"graph": "g", "measure": "orc", "time_s": 1.0, "peak_bytes": 1000},
+        {"graph": "g", "measure": "lly", "time_s": 0.001, "peak_bytes": 1000},
+        {"graph": "g", "measure": "grc_orc", "time_s": 1.0, "peak_bytes": None},
+    ]
+    baseline.write_text(json.dumps({"results": previous}), encoding="utf-8")
+    results = [
+        {"graph": "g", "measure": "orc", "time_s": 1.5, "peak_bytes": 1100},
+        # Tiny absolute slowdowns are noise, whatever the ratio.
+        {"graph": "g", "measure": "lly", "time_s": 0.005, "peak_bytes": 2000},
+        {"graph": "g", "measure": "grc_orc", "time_s": 1.1, "peak_bytes": 5000},
+        {"graph": "new", "measure": "orc", "time_s": 9.0, "peak_bytes": 9000},
+    ]
+    regressions = compare_baseline(results, str(baseline), 0.25, 0.25, 0.01)
+    assert regressions == ["g orc: time 1.0000s -> 1.5000s", "g lly: peak 1000 -> 2000 bytes"]
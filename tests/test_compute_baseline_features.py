@@ -0,0 +1,45 @@
+import csv
+import os
+
+import pytest
+
+from compute_baseline_features import BASELINE_FIELDS, baseline_features, compare_with_r
+
+R_EXPORT = os.path.join(os.path.dirname(__file__), "data", "baseline_r_export.csv")
+# Path x1-r1-x2-r2-x3-r3 and a star, small enough for both pipelines.
+NETWORKS = {
+    "path6": [("r1", "x1"), ("r1", "x2"), ("r2", "x2"), ("r2", "x3"), ("r3", "x3")],
+    "star4": [("r1", "x1"), ("r1", "x2"), ("r1", "x3"), ("r1", "x4")],
+    "py_only": [("r1", "x1"), ("r2", "x1")],
+}
+
+
+def python_rows():
+    rows = []
+    for name, edges in NETWORKS.items():
+        values, _, _ = baseline_features(edges)
+        rows.append(dict(values, name=name))
+    return rows
+
+
+def test_compare_with_r_matches_analytic_export(tmp_path):
+    output = tmp_path / "parity.csv"
+    summary = compare_with_r(python_rows(), R_EXPORT, "empirical", str(output))
+
+    assert set(summary) == set(BASELINE_FIELDS)
+    for key, stats in summary.items():
+        assert stats["max_rel_diff"] < 1e-6, key
+    # NA in the export (the star's degenerate eigenvectors, its single-row
+    # projection) is not compared.
+    assert summary["l1"]["n"] == 2
+    assert summary["ipr2"]["n"] == 1
+    assert summary["clustering_r"]["n"] == 1
+    with open(output, newline="", encoding="utf-8") as f:
+        assert [row["feature"] for row in csv.DictReader(f)] == BASELINE_FIELDS
+
+
+def test_compare_with_r_filters_randomization():
+    summary = compare_with_r(python_rows(), R_EXPORT, "configuration")
+    assert summary["l1"]["n"] == 1
+    assert summary["l1"]["worst"] == "path6"
+    assert summary["l1"]["max_rel_diff"] == pytest.approx((2.5 - 1.8019377) / 2.5, abs=1e-6)
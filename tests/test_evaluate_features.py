@@ -0,0 +1,109 @@
+import random
+import re
+
+import numpy as np
+import pytest
+
+import evaluate_features
+from build_splits import stratified_split
+from evaluate_features import (
+    CLASSIFIERS,
+    DEFAULT_SUBSETS,
+    evaluate,
+    parse_assignment,
+    replicate_masks,
+    standardize,
+    subset_columns,
+)
+
+FEATURES = [
+    "grc.node_count",
+    "grc.edge_count",
+    "grc.orc_count",
+    "grc.orc_mean",
+    "grc.frc_count",
+    "grc.frc_q95",
+    "gcs.orc_idl_count",
+    "gcs.orc_idl_mean",
+    "gcs.orc_sk_count",
+    "gcs.orc_sk_mean",
+    "gcs.orc_sk_err_mean",
+    "gcs.orc_sk_err_max",
+    "gcs.be_norm_count",
+    "gcs.be_norm_mean",
+    "baseline.l1",
+    "baseline.deg_assort",
+    "r.alg_conn",
+]
+
+
+def selected(subset):
+    pattern = re.compile(dict(parse_assignment(value) for value in DEFAULT_SUBSETS)[subset])
+    return [FEATURES[i] for i in subset_columns(pattern, FEATURES)]
+
+
+def test_default_subsets_select_expected_columns():
+    assert selected("orc") == ["grc.orc_mean", "gcs.orc_idl_mean", "gcs.orc_sk_mean"]
+    assert selected("forman") == ["grc.frc_q95"]
+    assert selected("baseline") == ["baseline.l1", "baseline.deg_assort", "r.alg_conn"]
+    assert selected("combined") == FEATURES
+
+
+def labelled(n_per_class, classes=3):
+    names = [f"net{i}" for i in range(n_per_class * classes)]
+    labels = [f"type{i % classes}" for i in range(len(names))]
+    return names, labels
+
+
+def test_replicate_masks_follow_build_splits():
+    names, labels = labelled(7)
+    train = replicate_masks(names, labels, 5, 11, 0.25)
+    rows = [{"name": name, "label": label} for name, label in zip(names, labels)]
+    for r in range(5):
+        split_rows, _ = stratified_split(rows, lambda row: row["label"], random.Random(11 + r), 0.25)
+        expected = {row["name"] for row, _, split in split_rows if split == "train"}
+        assert {name for name, keep in zip(names, train[r]) if keep} == expected
+    # Each class keeps round(7 * 0.25) = 2 networks in test, and replicates differ.
+    assert (~train).sum(axis=1).tolist() == [6] * 5
+    assert len({row.tobytes() for row in train}) > 1
+
+
+def test_standardize_uses_training_rows_only():
+    X = np.array([[1.0, 10.0], [3.0, np.nan], [np.nan, 30.0], [100.0, -50.0]])
+    train = np.array([[True, True, True, False]])
+    Z = standardize(X, train)
+    assert Z.shape == (1, 4, 2)
+    # Column 0 trains on 1 and 3, column 1 on 10 and 30; the test row is ignored.
+    assert Z[0, :, 0].tolist() == [-1.0, 1.0, 0.0, 98.0]
+    assert Z[0, :, 1].tolist() == [-1.0, 0.0, 1.0, -7.0]
+    # Moving the test row changes nothing else.
+    X[3] = [-1e6, 1e6]
+    assert np.array_equal(standardize(X, train)[0, :3], Z[0, :3])
+
+
+def scored(X, y, replicates, classifier):
+    names = [f"net{i}" for i in range(len(y))]
+    train = replicate_masks(names, y.tolist(), replicates, 3, 0.25)
+    return evaluate((X, y, train, classifier, 1e-2, 300))
+
+
+@pytest.mark.parametrize("classifier", CLASSIFIERS)
+def test_classifiers_on_separable_data_and_noise(classifier, monkeypatch):
+    rng = np.random.default_rng(0)
+    y = np.repeat(np.arange(3), 20)
+    separable = rng.normal(size=(60, 4)) * 0.3 + np.eye(3, 4)[y] * 5
+    separable[rng.random(separable.shape) < 0.05] = np.nan
+    accuracy, balanced = scored(separable, y, 10, classifier)
+    assert accuracy.min() == balanced.min() == 1.0
+
+    noise = rng.normal(size=(60, 4))
+    accuracy, balanced = scored(noise, y, 60, classifier)
+    assert abs(accuracy.mean() - 1 / 3) < 0.1
+    assert abs(balanced.mean() - 1 / 3) < 0.1
+
+    # Chunks of two replicates give the same scores as one pass.
+    monkeypatch.setattr(evaluate_features, "CHUNK_ELEMENTS", 2 * noise.size)
+    chunked = scored(noise, y, 60, classifier)
+    assert np.allclose(chunked[0], accuracy) and np.allclose(chunked[1], balanced)
+    monkeypatch.setattr(evaluate_features, "CHUNK_ELEMENTS", 2 * separable.size)
+    assert scored(separable, y, 10, classifier)[0].min() == 1.0
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+import feature_store
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+
+def ingest(store, filename, backend):
+    part, created = feature_store.ingest_csv(str(store), os.path.join(DATA, filename), "exp", backend)
+    assert created
+    return part
+
+
+def test_baseline_keeps_every_randomization(tmp_path):
+    ingest(tmp_path, "baseline_export.csv", "baseline")
+    table = feature_store.load(str(tmp_path), backend="baseline")
+    assert len(table["name"]) == 6
+    assert sorted(set(table["randomization"])) == ["configuration", "empirical", "erdos"]
+    # Key columns stay text: "001" is not read back as 1.
+    assert table["name"].dtype.kind == "U"
+    assert "001" in set(table["name"])
+    assert set(table["type"]) == {"ecologicalinteractions"}
+    assert set(table["type_label"]) == {"herbivory", "pollination"}
+    assert "type_raw" not in table
+
+
+def test_empty_key_column_stays_text(tmp_path):
+    path = tmp_path / "features.csv"
+    path.write_text("name,type,orc_mean\n001,,0.5\n002,,0.25\n", encoding="utf-8")
+    feature_store.ingest_csv(str(tmp_path / "store"), str(path), "exp", "grc")
+    table = feature_store.load(str(tmp_path / "store"))
+    assert table["type"].tolist() == ["", ""]
+    assert table["name"].tolist() == ["001", "002"]
+
+
+def test_duplicate_keys_are_rejected(tmp_path):
+    path = tmp_path / "features.csv"
+    path.write_text("name,type,orc_mean\na,x,0.5\na,x,0.25\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="share the key"):
+        feature_store.ingest_csv(str(tmp_path / "store"), str(path), "exp", "grc")
+
+
+def test_join_baseline_export_with_curvature(tmp_path):
+    ingest(tmp_path, "baseline_export.csv", "baseline")
+    ingest(tmp_path, "curvature_features.csv", "grc")
+    baseline = feature_store.load(str(tmp_path), backend="baseline", columns=["type_label", "l1"])
+    curvature = feature_store.load(str(tmp_path), backend="grc", columns=["orc_mean", "frc_mean"])
+
+    joined = feature_store.join(baseline, curvature, suffix="_grc")
+    assert len(joined["name"]) == 6
+    assert not np.isnan(joined["orc_mean"]).any()
+    by_name = dict(zip(joined["name"], joined["orc_mean"]))
+    assert by_name == {"001": pytest.approx(-0.1031), "M_PL_002": pytest.approx(-0.2418)}
+
+    # Several baseline rows per network cannot be attached to one curvature row.
+    with pytest.raises(ValueError, match="share the key"):
+        feature_store.join(curvature, baseline)
+
+
+def test_experiments_are_kept_apart(tmp_path):
+    for exp_id in ("pilot", "full"):
+        feature_store.ingest_csv(str(tmp_path), os.path.join(DATA, "baseline_export.csv"), exp_id, "baseline")
+    table = feature_store.load(str(tmp_path), backend="baseline")
+    assert len(table["name"]) == 12
+    assert list(table)[0] == "exp_id"
+    assert sorted(table["exp_id"].tolist()) == ["full"] * 6 + ["pilot"] * 6
+    assert "backend" not in table
+    assert "exp_id" not in feature_store.load(str(tmp_path), exp_id="pilot", backend="baseline")
+
+
+def test_join_keeps_integer_columns(tmp_path):
+    ingest(tmp_path, "baseline_export.csv", "baseline")
+    ingest(tmp_path, "curvature_features.csv", "grc")
+    baseline = feature_store.load(str(tmp_path), backend="baseline", columns=["l1"])
+    curvature = feature_store.load(str(tmp_path), backend="grc", columns=["node_count"])
+    joined = feature_store.join(baseline, curvature)
+    assert joined["node_count"].dtype == np.int64
+
+    output = tmp_path / "out.csv"
+    feature_store.write_table_csv(joined, str(output))
+    assert ",30\n" in output.read_text(encoding="utf-8")
+
+    # A network without curvature leaves a gap, so that column becomes float.
+    partial = {column: values[:1] for column, values in curvature.items()}
+    joined = feature_store.join(baseline, partial)
+    assert joined["node_count"].dtype.kind == "f"
+    assert np.isnan(joined["node_count"]).sum() == 3
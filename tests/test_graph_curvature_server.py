@@ -0,0 +1,58 @@
+import concurrent.futures
+
+import pytest
+
+from compute_curvature_features_gcs import load_gcs_modules
+
+# Stubs web.py when it is not installed, as the extractor does.
+curvature, graph = load_gcs_modules()
+
+
+def test_result_cache_is_consistent_under_concurrent_requests():
+    cache = graph.ResultCache(8)
+    rounds = 2000
+
+    def hammer(worker):
+        for i in range(rounds):
+            key = (worker + i) % 16
+            if cache.get(key) is None:
+                cache.put(key, [float(key)])
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(hammer, range(8)))
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 8 * rounds
+    assert stats["entries"] == len(cache.entries) <= 8
+    assert all(value == [float(key)] for key, value in cache.entries.items())
+
+
+def test_concurrent_batches_share_the_cache():
+    cache = graph.ResultCache(64)
+    request = {"measures": ["orc", "be_norm"], "graphs": [{"id": "path", "n": 4, "edges": [[0, 1], [1, 2], [2, 3]]}]}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: graph.solve_batch(request, cache), range(16)))
+    first = responses[0]["graphs"][0]
+    for response in responses:
+        assert response["graphs"][0]["edge"] == first["edge"]
+        assert response["graphs"][0]["vertex"] == first["vertex"]
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] + stats["misses"] == 32
+
+
+def test_batch_matches_per_edge_solvers():
+    # Unordered, reversed and repeated edges and a self-loop are canonicalised.
+    edges = [[1, 0], [1, 2], [2, 3], [3, 0], [0, 2], [0, 1], [4, 2], [3, 3]]
+    request = {"measures": ["orc", "lly", "link_res"], "graphs": [{"id": "g", "n": 5, "edges": edges}]}
+    response = graph.solve_batch(request, graph.ResultCache(16))["graphs"][0]
+    pairs = [(0, 1), (0, 2), (0, 3), (1, 2), (2, 3), (2, 4)]
+    assert response["edges"] == [list(p) for p in pairs]
+    assert not response["errors"]
+
+    A = [[0] * 5 for _ in range(5)]
+    for i, j in pairs:
+        A[i][j] = A[j][i] = 1
+    link_res = curvature.linkResistanceCurvature(A)
+    assert response["edge"]["orc"] == pytest.approx([graph.ocurve(i, j, A) for i, j in pairs])
+    assert response["edge"]["lly"] == pytest.approx([graph.LLYcurv(i, j, A) for i, j in pairs])
+    assert response["edge"]["link_res"] == pytest.approx([link_res[i][j] for i, j in pairs])
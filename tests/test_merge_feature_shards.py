@@ -0,0 +1,133 @@
+import argparse
+import csv
+import sys
+
+import pytest
+
+import merge_feature_shards
+from sharding import assign_shards, build_manifest, select_candidates, shard_output_path, write_manifest
+
+# (name, nrows, ncols, nlinks); "extra" is outside the split set.
+NETWORKS = [
+    ("n0", 10, 12, 40),
+    ("n1", 30, 25, 200),
+    ("n2", 5, 6, 12),
+    ("extra", 8, 8, 20),
+    ("n3", 20, 22, 90),
+    ("n4", 15, 9, 50),
+    ("n5", 40, 30, 300),
+]
+SKIPPED = {"n2": "missing_path"}
+COUNT = 2
+
+
+def write_csv(path, fieldnames, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def make_shards(tmp_path):
+    index = tmp_path / "index.csv"
+    split = tmp_path / "split.csv"
+    write_csv(
+        index,
+        ["name", "nrows", "ncols", "nlinks"],
+        [dict(zip(("name", "nrows", "ncols", "nlinks"), network)) for network in NETWORKS],
+    )
+    write_csv(
+        split,
+        ["name", "split"],
+        [{"name": name, "split": "test" if name == "extra" else "train"} for name, *_ in NETWORKS],
+    )
+    args = argparse.Namespace(dataset_index=str(index), split=str(split), split_set="train", max_edges=1000, limit=0)
+    with open(index, newline="", encoding="utf-8") as f:
+        candidates = select_candidates(list(csv.DictReader(f)), {name for name, *_ in NETWORKS if name != "extra"})
+    plan = assign_shards(candidates, COUNT)
+
+    output = str(tmp_path / "features" / "out.csv")
+    (tmp_path / "features").mkdir()
+    shards = {}
+    for shard in range(COUNT):
+        assigned = sorted(name for name, target in plan.items() if target == shard)
+        skipped = {name: reason for name, reason in SKIPPED.items() if name in assigned}
+        processed = [name for name in assigned if name not in skipped]
+        path = shard_output_path(output, (shard, COUNT))
+        manifest = build_manifest(args, (shard, COUNT), path, assigned, processed, skipped)
+        # Shards write in completion order, not index order.
+        rows = [{"name": name, "orc_mean": f"0.{i}"} for i, name in enumerate(reversed(processed))]
+        shards[shard] = (manifest, rows)
+    return output, plan, shards
+
+
+def run_merge(monkeypatch, capsys, output, shards):
+    for manifest, rows in shards.values():
+        write_csv(manifest["output"], ["name", "orc_mean"], rows)
+        write_manifest(manifest["output"], manifest)
+    monkeypatch.setattr(sys, "argv", ["merge_feature_shards.py", "--output", output])
+    try:
+        merge_feature_shards.main()
+    except SystemExit as exc:
+        return exc.code, capsys.readouterr().err
+    return 0, capsys.readouterr().err
+
+
+def test_merge_restores_index_order(tmp_path, monkeypatch, capsys):
+    output, plan, shards = make_shards(tmp_path)
+    assert set(plan.values()) == set(range(COUNT))
+    code, err = run_merge(monkeypatch, capsys, output, shards)
+    assert code == 0, err
+    with open(output, newline="", encoding="utf-8") as f:
+        assert [row["name"] for row in csv.DictReader(f)] == ["n0", "n1", "n3", "n4", "n5"]
+
+
+def test_merge_rejects_a_missing_shard(tmp_path, monkeypatch, capsys):
+    output, plan, shards = make_shards(tmp_path)
+    del shards[1]
+    code, err = run_merge(monkeypatch, capsys, output, shards)
+    assert code == 1
+    assert "missing shard 1/2" in err
+    assert "belong to missing shards" in err
+
+
+def test_merge_rejects_a_duplicate_row(tmp_path, monkeypatch, capsys):
+    output, plan, shards = make_shards(tmp_path)
+    shards[1][1].append(dict(shards[0][1][0]))
+    code, err = run_merge(monkeypatch, capsys, output, shards)
+    assert code == 1
+    assert f"{shards[0][1][0]['name']} written 2 times" in err
+
+
+def test_merge_rejects_a_misassigned_network(tmp_path, monkeypatch, capsys):
+    output, plan, shards = make_shards(tmp_path)
+    (first, first_rows), (second, second_rows) = shards[0], shards[1]
+    moved = first_rows.pop()
+    first["assigned"].remove(moved["name"])
+    second["assigned"].append(moved["name"])
+    second_rows.append(moved)
+    code, err = run_merge(monkeypatch, capsys, output, shards)
+    assert code == 1
+    assert f"{moved['name']} belongs to shard 0 but was not assigned there" in err
+    assert f"{moved['name']} was assigned to shard 1 but does not belong there" in err
+
+
+def test_merge_rejects_a_network_without_row_or_skip(tmp_path, monkeypatch, capsys):
+    output, plan, shards = make_shards(tmp_path)
+    lost = shards[0][1].pop()
+    code, err = run_merge(monkeypatch, capsys, output, shards)
+    assert code == 1
+    assert f"{lost['name']} (shard 0) has neither a row nor a skip reason" in err
+    assert not (tmp_path / "features" / "out.csv").exists()
+
+
+@pytest.mark.parametrize(
+    "key, value",
+    [("parameters", {"limit": 0, "max_edges": 500, "split_set": "train"}), ("dataset_index_sha256", "0" * 64)],
+)
+def test_merge_rejects_mismatched_shards(tmp_path, monkeypatch, capsys, key, value):
+    output, plan, shards = make_shards(tmp_path)
+    shards[1][0][key] = value
+    code, err = run_merge(monkeypatch, capsys, output, shards)
+    assert code == 1
+    assert f"shard 1 disagrees with shard 0 on {key}" in err
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from benchmark_curvature import generate_bipartite, grc_graph, grc_orc_exact
+from compute_curvature_features_gcs import build_adjacency, load_gcs_modules, summarize
+from ollivier_sinkhorn import ZERO_TOL, ollivier_sinkhorn
+
+pytest.importorskip("GraphRicciCurvature")
+
+
+@pytest.mark.parametrize("idleness", [0.0, 0.5])
+@pytest.mark.parametrize("nodes,connectance,heterogeneity", [(30, 0.3, 0.0), (60, 0.1, 1.5), (80, 0.3, 1.5)])
+def test_error_bound_holds_against_exact_otd(nodes, connectance, heterogeneity, idleness):
+    A, node_list, edge_pairs = build_adjacency(*generate_bipartite(nodes, connectance, heterogeneity, seed=7))
+    exact = grc_orc_exact(grc_graph(len(node_list), edge_pairs), idleness)
+    curvatures, bounds = ollivier_sinkhorn(A, edge_pairs, idleness)
+
+    error = np.abs(np.array(curvatures) - np.array([exact[e] for e in edge_pairs]))
+    bounds = np.array(bounds)
+    assert np.all(error <= bounds + 1e-9)
+    assert error.max() < 5e-3
+    # The rounded integer dual closes the gap on almost every edge. Edges
+    # snapped to 0 report the whole bracket, which is wider than their error.
+    moved = np.array(curvatures) != 0
+    assert np.mean(bounds[moved] <= error[moved] + 1e-9) > 0.9
+
+
+def test_zero_curvature_edges_keep_their_sign():
+    _, gcs_graph = load_gcs_modules()
+    A, _, edge_pairs = build_adjacency(*generate_bipartite(40, 0.3, 1.0, seed=7))
+    # scipy's LP leaves some zero-curvature edges at -1e-12 and the like.
+    exact = [0.0 if abs(v) <= ZERO_TOL else v for v in (gcs_graph.ocurve(i, j, A) for i, j in edge_pairs)]
+    curvatures, _ = ollivier_sinkhorn(A, edge_pairs)
+    # Most edges of this web have curvature exactly 0.
+    assert exact.count(0.0) > len(exact) / 2
+    approx = summarize(curvatures, "orc_sk")
+    expected = summarize(exact, "orc_sk")
+    assert approx["orc_sk_neg_frac"] == expected["orc_sk_neg_frac"]
+    assert approx["orc_sk_q50"] == expected["orc_sk_q50"] == 0.0
+    assert str(approx["orc_sk_q50"]) == "0.0"
@@ -0,0 +1,75 @@
+from pipeline_runner import is_current, resolve_stages, select_stages, stage_fingerprint, write_stamp
+
+
+def make_config(tmp_path):
+    return {
+        "stages": {
+            "prepare": {
+                "cmd": ["prepare", "{n}"],
+                "inputs": [str(tmp_path / "raw.csv")],
+                "outputs": [str(tmp_path / "prepared.csv")],
+            },
+            "compute": {
+                "cmd": ["compute", "{n}"],
+                "inputs": [str(tmp_path / "prepared.csv"), str(tmp_path / "lib" / "*.py")],
+                "outputs": [str(tmp_path / "features.csv")],
+            },
+            "other": {"cmd": ["other"], "outputs": [str(tmp_path / "other.csv")]},
+        }
+    }
+
+
+def run_fake(state_dir, stages, name):
+    stage = stages[name]
+    for output in stage["outputs"]:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(name + "\n")
+    write_stamp(state_dir, name, stage, stage_fingerprint(stage), 0.0)
+
+
+def test_resolve_stages_expands_globs_and_infers_deps(tmp_path):
+    (tmp_path / "lib").mkdir()
+    for module in ("b.py", "a.py"):
+        (tmp_path / "lib" / module).write_text("", encoding="utf-8")
+    stages = resolve_stages(make_config(tmp_path), {"n": 3})
+    assert stages["compute"]["cmd"] == ["compute", "3"]
+    assert stages["compute"]["inputs"][1:] == [str(tmp_path / "lib" / "a.py"), str(tmp_path / "lib" / "b.py")]
+    assert stages["compute"]["deps"] == ["prepare"]
+    assert select_stages(stages, ["compute"]) == {"compute", "prepare"}
+    assert select_stages(stages, []) == {"compute", "prepare", "other"}
+
+
+def test_is_current_until_an_input_or_param_changes(tmp_path):
+    state_dir = str(tmp_path / "state")
+    (tmp_path / "state").mkdir()
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "helper.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "raw.csv").write_text("a\n", encoding="utf-8")
+    config = make_config(tmp_path)
+
+    stages = resolve_stages(config, {"n": 3})
+    stage = stages["compute"]
+    assert not is_current(state_dir, "compute", stage, stage_fingerprint(stage))
+    run_fake(state_dir, stages, "prepare")
+    run_fake(state_dir, stages, "compute")
+    # Same inputs and params: skip.
+    stages = resolve_stages(config, {"n": 3})
+    assert is_current(state_dir, "compute", stages["compute"], stage_fingerprint(stages["compute"]))
+
+    # A changed param reruns.
+    changed = resolve_stages(config, {"n": 4})
+    assert not is_current(state_dir, "compute", changed["compute"], stage_fingerprint(changed["compute"]))
+
+    # A helper module matched by the glob, edited or added, reruns.
+    (tmp_path / "lib" / "helper.py").write_text("x = 2\n", encoding="utf-8")
+    stages = resolve_stages(config, {"n": 3})
+    assert not is_current(state_dir, "compute", stages["compute"], stage_fingerprint(stages["compute"]))
+    run_fake(state_dir, stages, "compute")
+    (tmp_path / "lib" / "new.py").write_text("", encoding="utf-8")
+    stages = resolve_stages(config, {"n": 3})
+    assert not is_current(state_dir, "compute", stages["compute"], stage_fingerprint(stages["compute"]))
+    run_fake(state_dir, stages, "compute")
+
+    # So does a clobbered output.
+    (tmp_path / "features.csv").write_text("edited\n", encoding="utf-8")
+    assert not is_current(state_dir, "compute", stages["compute"], stage_fingerprint(stages["compute"]))
@@ -0,0 +1,72 @@
+import os
+import pstats
+import time
+
+import pytest
+
+from profiling import measure_label, profile_settings, profiled_call, summarize_profiles
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+def settings(directory, names=()):
+    class Args:
+        profile = str(directory)
+        profile_names = list(names)
+
+    return profile_settings(Args)
+
+
+def test_measure_label():
+    assert measure_label(("orc_idl", 0.25)) == "orc_idl-0.25"
+    assert measure_label(("orc", 0.5, False)) == "orc-0.5-False"
+    assert measure_label(("be_norm", "full", None)) == "be_norm-full"
+    assert measure_label(("be_norm", "sign", 3.0, (-0.5, 0.5))) == "be_norm-sign-3.0--0.5,0.5"
+    assert measure_label(("orc_sk", 0.0, ("reg", 0.05), ("tol", 1e-06))) == "orc_sk-0.0-reg=0.05-tol=1e-06"
+
+
+def test_profile_names_select_networks(tmp_path):
+    profile = settings(tmp_path, ["net1"])
+    assert profiled_call(profile, "net1", "orc", busy, 1000) == busy(1000)
+    assert profiled_call(profile, "net2", "orc", busy, 1000) == busy(1000)
+    assert profiled_call(None, "net1", "frc", busy, 10) == busy(10)
+    assert os.listdir(tmp_path) == ["net1.orc.prof"]
+
+    profiled_call(settings(tmp_path), "net/2", "orc_idl-0.5", busy, 10)
+    assert sorted(os.listdir(tmp_path)) == ["net1.orc.prof", "net_2.orc_idl-0.5.prof"]
+
+
+def test_summary_aggregates_only_this_runs_profiles(tmp_path):
+    profile = settings(tmp_path)
+    profiled_call(profile, "old", "orc", busy, 10)
+    old = os.path.join(tmp_path, "old.orc.prof")
+    os.utime(old, (time.time() - 3600, time.time() - 3600))
+
+    assert summarize_profiles(str(tmp_path), time.time())[0].startswith("profile: no profiles")
+
+    since = time.time()
+    for name in ("a", "b"):
+        profiled_call(profile, name, "orc", busy, 1000)
+    lines = summarize_profiles(str(tmp_path), since, top=5)
+    assert lines[0].startswith("profile: 2 profiles")
+    assert lines[1].lstrip().startswith("ncalls")
+    with open(tmp_path / "hot_functions.txt", encoding="utf-8") as f:
+        assert f.readline() == "2 profiles\n"
+    calls = {func[2]: stat[1] for func, stat in pstats.Stats(str(tmp_path / "a.orc.prof")).stats.items()}
+    assert calls["busy"] == 1
+
+
+def test_grc_orc_profile_sees_the_edge_computation(tmp_path):
+    pytest.importorskip("GraphRicciCurvature")
+    import networkx as nx
+
+    from compute_curvature_features import compute_orc
+
+    g = nx.convert_node_labels_to_integers(nx.complete_bipartite_graph(3, 4))
+    profile = settings(tmp_path)
+    values = profiled_call(profile, "k34", "orc", compute_orc, g.copy(), 0.5, 1, True)
+    assert values == pytest.approx(compute_orc(g.copy(), 0.5, 1))
+    functions = {func[2] for func in pstats.Stats(str(tmp_path / "k34.orc.prof")).stats}
+    assert "_compute_ricci_curvature_single_edge" in functions
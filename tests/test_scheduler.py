@@ -0,0 +1,183 @@
+import argparse
+import collections
+import concurrent.futures
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import scheduler
+
+from scheduler import (
+    DEFAULT_MEMORY_MODEL,
+    JOB_OVERHEAD_BYTES,
+    MIN_FACTOR,
+    MemoryModel,
+    Task,
+    _pick,
+    blas_threads,
+    check_blas_control,
+    measured_call,
+    memory_model,
+    scheduled_map,
+)
+
+MB = 1 << 20
+
+
+# Workers are separate processes, so the stub has to live at module level.
+def timed_sleep(payload):
+    start = time.monotonic()
+    time.sleep(payload)
+    return start, time.monotonic()
+
+
+def allocate(size):
+    block = bytearray(size)
+    block[::4096] = b"x" * len(block[::4096])
+    return len(block)
+
+
+def allocate_in_child(size):
+    # Like GRC's ORC: the work happens in a forked pool child.
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        return pool.apply(allocate, (size,))
+
+
+def make_tasks(sizes, model, delays=None):
+    delays = delays or [0.05] * len(sizes)
+    return [Task(i, delay, f"net{i}", {"orc": size}, model) for i, (size, delay) in enumerate(zip(sizes, delays))]
+
+
+def test_estimate_scales_dominant_measure():
+    model = MemoryModel()
+    model.factors["be_norm"] = 0.5
+    assert model.estimate({}) == (JOB_OVERHEAD_BYTES, "")
+    assert model.estimate({"orc": 100 * MB, "be_norm": 300 * MB}) == (150 * MB + JOB_OVERHEAD_BYTES, "be_norm")
+    model.factors["orc"] = 2.0
+    assert model.estimate({"orc": 100 * MB, "be_norm": 300 * MB}) == (200 * MB + JOB_OVERHEAD_BYTES, "orc")
+
+
+def test_observe_raises_at_once_and_decays_slowly():
+    model = MemoryModel()
+    model.observe("orc", 100 * MB, 300 * MB + JOB_OVERHEAD_BYTES)
+    assert model.factors["orc"] == 3.0
+    model.observe("orc", 100 * MB, 100 * MB + JOB_OVERHEAD_BYTES)
+    assert model.factors["orc"] == 2.6
+    model.observe("orc", 100 * MB, 0)
+    assert model.factors["orc"] == 2.08
+    # Small jobs and missing measurements do not calibrate.
+    model.observe("orc", MB, 100 * MB)
+    model.observe("orc", 100 * MB, None)
+    assert model.factors["orc"] == 2.08 and model.samples["orc"] == 3
+    for _ in range(20):
+        model.observe("lly", 100 * MB, 0)
+    assert model.factors["lly"] == MIN_FACTOR
+
+
+def test_model_is_only_persisted_when_asked_for(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args = argparse.Namespace(memory_model=None, memory_limit=0)
+    assert memory_model(args).path == ""
+    args.memory_limit = 8 << 30
+    assert memory_model(args).path == DEFAULT_MEMORY_MODEL
+    args = argparse.Namespace(memory_model="model.json", memory_limit=0)
+    model = memory_model(args)
+    model.observe("orc", 100 * MB, 300 * MB + JOB_OVERHEAD_BYTES)
+    model.save()
+    assert MemoryModel("model.json").factors == {"orc": 3.0}
+
+
+def test_pick_stops_packing_around_a_starved_head():
+    model = MemoryModel()
+    head, *small = make_tasks([500 * MB, MB, MB, MB], model)
+    pending = collections.deque([head, *small])
+    fits = lambda task: task.estimate < 100 * MB  # noqa: E731
+    running = {"busy": None}
+    assert _pick(pending, fits, running, max_skips=2) is small[0]
+    assert _pick(pending, fits, running, max_skips=2) is small[1]
+    assert head.skips == 2
+    assert _pick(pending, fits, running, max_skips=2) is None
+    # Once nothing runs, the head goes regardless of fit.
+    assert _pick(pending, fits, {}, max_skips=2) is head
+
+
+def test_admission_stays_under_memory_limit_and_yields_in_order():
+    model = MemoryModel()
+    sizes = [200 * MB, 10 * MB, 200 * MB, 200 * MB, 10 * MB, 200 * MB]
+    delays = [0.2, 0.05, 0.15, 0.1, 0.05, 0.02]
+    limit = 500 * MB
+    tasks = make_tasks(sizes, model, delays)
+    results = list(scheduled_map(timed_sleep, tasks, workers=4, memory_limit=limit, model=model))
+    assert [task.index for task, _ in results] == list(range(len(sizes)))
+    for task, (start, _) in results:
+        overlapping = [other.estimate for other, (s, e) in results if s <= start < e]
+        assert sum(overlapping) <= limit, task.label
+
+
+def test_estimates_follow_the_live_model():
+    model = MemoryModel()
+    tasks = make_tasks([MB, MB, MB], model)
+    # Only one task fits at a time, so each is admitted after the previous
+    # result has been handed back.
+    limit = JOB_OVERHEAD_BYTES + 3 * MB // 2
+    results = scheduled_map(timed_sleep, tasks, workers=2, memory_limit=limit, model=model)
+    first, _ = next(results)
+    assert first.estimate == MB + JOB_OVERHEAD_BYTES
+    model.factors["orc"] = 2.0
+    rest = [task for task, _ in results]
+    assert [task.estimate for task in rest] == [2 * MB + JOB_OVERHEAD_BYTES] * 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_measurement_includes_forked_children():
+    # A fresh worker, as under scheduled_map, so no earlier child of this
+    # process has already set a higher peak.
+    size = 200 * MB
+    context = multiprocessing.get_context("fork")
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+        result, measured, _ = pool.submit(measured_call, allocate_in_child, size).result()
+        own, own_measured, _ = pool.submit(measured_call, allocate, 20 * MB).result()
+    assert result == size and own == 20 * MB
+    assert measured >= 0.8 * size
+    assert own_measured < 0.5 * size
+
+
+def test_blas_threads_per_strategy():
+    small = {"nrows": "10", "ncols": "10", "nlinks": "30"}
+    large = {"nrows": "150", "ncols": "100", "nlinks": "2000"}
+    for row in (small, large):
+        assert blas_threads("", 8, 200, row, {"be_norm"}) == 0
+        assert blas_threads("processes", 8, 200, row, {"be_norm"}) == 1
+        assert blas_threads("threads", 8, 200, row, {"orc"}) == 8
+    assert blas_threads("hybrid", 8, 200, large, {"orc", "be_norm"}) == 8
+    assert blas_threads("hybrid", 8, 250, large, {"be_norm"}) == 8
+    assert blas_threads("hybrid", 8, 251, large, {"be_norm"}) == 1
+    assert blas_threads("hybrid", 8, 200, small, {"be_norm"}) == 1
+    # Large but with no BLAS-bound measure enabled.
+    assert blas_threads("hybrid", 8, 200, large, {"orc", "frc"}) == 1
+
+
+def test_admitted_threads_stay_within_cores():
+    model = MemoryModel()
+    threads = [4, 1, 1, 2, 1, 4, 1, 2]
+    tasks = make_tasks([MB] * len(threads), model, [0.1, 0.05, 0.1, 0.05, 0.1, 0.05, 0.1, 0.05])
+    for task, count in zip(tasks, threads):
+        task.threads = count
+    cores = 4
+    results = list(scheduled_map(timed_sleep, tasks, workers=4, model=model, cores=cores))
+    assert [task.index for task, _ in results] == list(range(len(threads)))
+    for task, (start, _) in results:
+        overlapping = [max(1, other.threads) for other, (s, e) in results if s <= start < e]
+        assert sum(overlapping) <= cores, task.label
+    # Single-thread networks still pack four at a time.
+    assert max(sum(1 for _, (s, e) in results if s <= start < e) for _, (start, _) in results) > 1
+
+
+def test_missing_threadpoolctl_warns(monkeypatch, capsys):
+    monkeypatch.setattr(scheduler, "threadpool_limits", None)
+    check_blas_control(argparse.Namespace(blas_strategy=""))
+    assert capsys.readouterr().err == ""
+    check_blas_control(argparse.Namespace(blas_strategy="hybrid"))
+    assert "threadpoolctl is not installed" in capsys.readouterr().err
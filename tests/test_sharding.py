@@ -0,0 +1,79 @@
+import argparse
+
+from batch_jobs import add_batch_argument
+from profiling import add_profile_arguments
+from scheduler import add_scheduler_arguments
+from sharding import (
+    assign_shards,
+    build_manifest,
+    estimate_cost,
+    execution_option,
+    network_size,
+    parse_shard,
+    record_limit_skips,
+)
+from streaming import add_prefetch_argument
+
+
+def extractor_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset-index")
+    parser.add_argument("--split", default="")
+    parser.add_argument("--split-set", default="")
+    parser.add_argument("--max-edges", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=2)
+    execution_option(parser, "--output", default="out.csv")
+    execution_option(parser, "--shard", type=parse_shard, default=(0, 2))
+    execution_option(parser, "--gcs-server", default="")
+    return parser
+
+
+def manifest_for(dataset_index, gcs_server):
+    args = extractor_parser().parse_args(["--dataset-index", dataset_index, "--gcs-server", gcs_server])
+    return build_manifest(args, args.shard, "out.shard-0-of-2.csv", {"a"}, ["a"], {})
+
+
+def test_parameters_ignore_input_paths_and_server(tmp_path):
+    first = tmp_path / "a" / "index.csv"
+    second = tmp_path / "b" / "index.csv"
+    for path in (first, second):
+        path.parent.mkdir()
+        path.write_text("name\na\n", encoding="utf-8")
+    left = manifest_for(str(first), "")
+    right = manifest_for(str(second), "http://localhost:8090")
+    assert left["parameters"] == right["parameters"] == {"limit": 2, "max_edges": 1000, "split_set": ""}
+    assert left["dataset_index_sha256"] == right["dataset_index_sha256"]
+
+
+def test_limit_skips_cover_unreached_networks():
+    skipped = {"b": "missing_path"}
+    assert record_limit_skips({"a", "b", "c", "d"}, ["a"], skipped) == 2
+    assert skipped == {"b": "missing_path", "c": "limit", "d": "limit"}
+
+
+def test_shared_options_register_as_execution_only():
+    parser = extractor_parser()
+    add_scheduler_arguments(parser)
+    add_batch_argument(parser)
+    add_prefetch_argument(parser)
+    add_profile_arguments(parser)
+    left = parser.parse_args(["--dataset-index", "index.csv"])
+    right = parser.parse_args(
+        ["--dataset-index", "index.csv", "--workers", "8", "--memory-limit", "8G", "--prefetch", "2", "--profile", "p"]
+    )
+    manifests = [build_manifest(args, args.shard, "out.csv", set(), [], {}) for args in (left, right)]
+    assert manifests[0]["parameters"] == manifests[1]["parameters"] == {"limit": 2, "max_edges": 1000, "split_set": ""}
+
+
+def test_cost_follows_the_scheduler_size_estimate(tmp_path):
+    edgelist = tmp_path / "net.txt"
+    edgelist.write_text("r0 c0\n" * 200, encoding="utf-8")
+    rows = [
+        {"name": "meta", "nrows": "10", "ncols": "30", "nlinks": "90"},
+        {"name": "file", "file_path": str(edgelist)},
+    ]
+    assert network_size(rows[0]) == (40, 90, (30, 10))
+    # 1200 bytes of edgelist -> 75 edges on int(sqrt(2 * 75)) = 12 nodes per side.
+    assert network_size(rows[1])[:2] == (24, 75)
+    assert [estimate_cost(row) for row in rows] == [40 ** 3 + 90 * 40, 24 ** 3 + 75 * 24]
+    assert assign_shards(rows, 2) == {"meta": 0, "file": 1}
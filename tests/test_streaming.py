@@ -0,0 +1,37 @@
+import gc
+import weakref
+
+from streaming import PipelineStats, prefetch
+
+
+class Task:
+    def __init__(self, index):
+        self.index = index
+        self.payload = (index, {})
+
+
+class Loaded:
+    pass
+
+
+def test_prefetch_releases_loaded_networks():
+    tasks = [Task(i) for i in range(6)]
+    refs = []
+
+    def load(payload):
+        loaded = Loaded()
+        refs.append(weakref.ref(loaded))
+        return loaded
+
+    depth = 2
+    for task in prefetch(tasks, load, depth, PipelineStats(depth)):
+        assert task.payload[:2] == (task.index, {})
+        assert isinstance(task.payload[2], Loaded)
+        gc.collect()
+        # The queue, the one the loader is waiting to enqueue and the task
+        # being computed.
+        assert sum(ref() is not None for ref in refs) <= depth + 2
+
+    gc.collect()
+    assert not any(ref() is not None for ref in refs)
+    assert all(len(task.payload) == 2 for task in tasks)
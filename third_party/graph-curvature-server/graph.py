@@ -1,5 +1,9 @@
 import web  # type: ignore[import]
 import json
+import hashlib
+import os
+import threading
+from collections import OrderedDict
 from scipy.optimize import linprog  # type: ignore[import]
 import scipy  # type: ignore[import]
 from scipy import optimize
@@ -94,8 +98,164 @@ def nonnorm_ocurve(x, y, A):
     return dx+dy+optimize.linprog(c=etanonnorm(dx+1, dy+1), A_ub=Amat(dx+1, dy+1), b_ub=d(x, y, A), bounds=(None, None)).fun
 
 
+"""
+Batch endpoint (local addition, not upstream).
+
+POST /batch with a JSON body
+  {"graphs": [{"id": "g1", "n": 4, "edges": [[0, 1], [1, 2], ...]}, ...],
+   "measures": ["orc", "be_norm", ...], "idleness": 0.5, "dimension": 3}
+returns, per graph, the canonical edge list (i < j, deduplicated), one value per
+edge for edge measures and one value per vertex for vertex measures. Each
+undirected edge is solved once. Results are cached by graph hash, measure and
+parameter, so repeated requests against a warm server skip the solvers.
+"""
+
+EDGE_MEASURES = {
+    "orc": lambda i, j, A, p: ocurve(i, j, A),
+    "orc_idl": lambda i, j, A, p: lazocurve(i, j, A, p["idleness"]),
+    "lly": lambda i, j, A, p: LLYcurv(i, j, A),
+    "nnlly": lambda i, j, A, p: nonnorm_ocurve(i, j, A),
+}
+
+VERTEX_MEASURES = {
+    "be_non_norm": lambda A, p: non_normalised_unweighted_curvature(A, inf),
+    "be_norm": lambda A, p: normalised_unweighted_curvature(A, inf),
+    "be_non_norm_dim": lambda A, p: non_normalised_unweighted_curvature(A, p["dimension"]),
+    "be_norm_dim": lambda A, p: normalised_unweighted_curvature(A, p["dimension"]),
+    "steiner": lambda A, p: steinerbergerCurvature(A),
+    "node_res": lambda A, p: nodeResistanceCurvature(A),
+}
+
+MEASURE_PARAMS = {
+    "orc_idl": "idleness",
+    "be_non_norm_dim": "dimension",
+    "be_norm_dim": "dimension",
+}
+
+
+class ResultCache:
+    # web.py serves each request on its own thread, so every access to the
+    # shared LRU goes through the lock. Measures are computed outside it; two
+    # requests missing the same key both compute it and the later put wins.
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+CACHE = ResultCache(int(os.environ.get("GCS_CACHE_SIZE", "4096")))
+
+
+def canonical_edges(n, edges):
+    pairs = set()
+    for u, v in edges:
+        i, j = int(u), int(v)
+        if not (0 <= i < n and 0 <= j < n):
+            raise ValueError("edge (%d, %d) out of range for n=%d" % (i, j, n))
+        if i == j:
+            continue
+        pairs.add((min(i, j), max(i, j)))
+    return sorted(pairs)
+
+
+def graph_hash(n, pairs):
+    h = hashlib.sha256()
+    h.update(str(n).encode())
+    for i, j in pairs:
+        h.update(b";%d,%d" % (i, j))
+    return h.hexdigest()
+
+
+def dense_adjacency(n, pairs):
+    A = [[0 for i in range(n)] for j in range(n)]
+    for i, j in pairs:
+        A[i][j] = 1
+        A[j][i] = 1
+    return A
+
+
+def solve_measure(measure, n, pairs, A, params):
+    if measure in EDGE_MEASURES:
+        f = EDGE_MEASURES[measure]
+        return [float(f(i, j, A, params)) for i, j in pairs]
+    if measure == "link_res":
+        LRC = linkResistanceCurvature(A)
+        return [float(LRC[i][j]) for i, j in pairs]
+    return [float(c) for c in VERTEX_MEASURES[measure](A, params)]
+
+
+def check_batch_params(measures, params):
+    for measure in measures:
+        if measure not in EDGE_MEASURES and measure not in VERTEX_MEASURES and measure != "link_res":
+            raise ValueError("unknown measure %s" % measure)
+    if "orc_idl" in measures and not 0 <= params.get("idleness", -1) < 1:
+        raise ValueError("idleness must be in [0, 1)")
+    if ("be_non_norm_dim" in measures or "be_norm_dim" in measures) and not params.get("dimension", 0) > 0:
+        raise ValueError("dimension must be positive")
+
+
+def solve_batch(request, cache=CACHE):
+    measures = list(request.get("measures", []))
+    params = {
+        "idleness": float(request.get("idleness", 0.5)),
+        "dimension": float(request.get("dimension", 0)),
+    }
+    check_batch_params(measures, params)
+
+    results = []
+    for graph in request.get("graphs", []):
+        n = int(graph["n"])
+        pairs = canonical_edges(n, graph.get("edges", []))
+        key = graph_hash(n, pairs)
+        out = {"id": graph.get("id"), "hash": key, "n": n, "edges": [list(p) for p in pairs],
+               "edge": {}, "vertex": {}, "cached": [], "errors": {}}
+        A = None
+        for measure in measures:
+            param = MEASURE_PARAMS.get(measure)
+            cache_key = (key, measure, params[param] if param else None)
+            values = cache.get(cache_key)
+            if values is None:
+                if A is None:
+                    A = dense_adjacency(n, pairs)
+                try:
+                    values = solve_measure(measure, n, pairs, A, params)
+                except Exception as e:
+                    out["errors"][measure] = str(e)
+                    continue
+                cache.put(cache_key, values)
+            else:
+                out["cached"].append(measure)
+            kind = "vertex" if measure in VERTEX_MEASURES else "edge"
+            out[kind][measure] = values
+        results.append(out)
+    return {"graphs": results, "cache": cache.stats()}
+
+
 urls = (
-  '/', 'index'
+  '/', 'index',
+  '/batch', 'batch'
 )
 web.config.debug = False
 
@@ -260,6 +420,17 @@ class index:
         return json.dumps(ret)
 
 
+class batch:
+    def POST(self):
+        web.header('Access-Control-Allow-Origin', '*')
+        web.header('Content-Type', 'application/json')
+        try:
+            request = json.loads(web.data())
+            return json.dumps(solve_batch(request))
+        except Exception as e:
+            return json.dumps({"error": str(e)})
+
+
 if __name__ == "__main__":
     app = web.application(urls, globals())
     app.run()